@@ -5,13 +5,14 @@ from .models import ContentType, ContentTypeField
 class ContentTypeFieldInline(admin.TabularInline):
     model = ContentTypeField
     extra = 1
-    fields = ['field_name', 'display_name', 'field_type', 'is_required', 'choices', 'help_text', 'order']
+    fields = ['field_name', 'display_name', 'field_type', 'is_required', 'choices', 'help_text', 'order', 'indexed', 'sort_order', 'index_status', 'search_weight']
+    readonly_fields = ['index_status']
 
 
 @admin.register(ContentType)
 class ContentTypeAdmin(admin.ModelAdmin):
-    list_display = ['display_name', 'name', 'is_active', 'created_at']
-    list_filter = ['is_active', 'created_at']
+    list_display = ['display_name', 'name', 'is_active', 'storage_mode', 'created_at']
+    list_filter = ['is_active', 'storage_mode', 'created_at']
     search_fields = ['name', 'display_name']
     inlines = [ContentTypeFieldInline]
     readonly_fields = ['created_at', 'updated_at']
@@ -20,15 +21,25 @@ class ContentTypeAdmin(admin.ModelAdmin):
         ('Basic Information', {
             'fields': ('name', 'display_name', 'description', 'is_active')
         }),
+        ('Storage', {
+            'fields': ('storage_mode',)
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
         }),
     )
+    
+    def get_readonly_fields(self, request, obj=None):
+        # Switching an existing type's storage has to move its entries
+        if obj is not None:
+            return self.readonly_fields + ['storage_mode']
+        return self.readonly_fields
 
 
 @admin.register(ContentTypeField)
 class ContentTypeFieldAdmin(admin.ModelAdmin):
-    list_display = ['content_type', 'field_name', 'display_name', 'field_type', 'is_required', 'order']
-    list_filter = ['content_type', 'field_type', 'is_required']
+    list_display = ['content_type', 'field_name', 'display_name', 'field_type', 'is_required', 'order', 'indexed', 'index_status']
+    list_filter = ['content_type', 'field_type', 'is_required', 'indexed', 'index_status']
+    readonly_fields = ['index_status']
     search_fields = ['field_name', 'display_name']
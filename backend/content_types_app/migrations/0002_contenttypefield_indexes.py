@@ -0,0 +1,28 @@
+# Generated by Django 5.0.1 on 2026-10-17 01:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content_types_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contenttypefield',
+            name='index_status',
+            field=models.CharField(blank=True, choices=[('pending', 'Pending'), ('building', 'Building'), ('ready', 'Ready'), ('failed', 'Failed')], editable=False, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='contenttypefield',
+            name='indexed',
+            field=models.BooleanField(default=False, help_text='Maintain a MongoDB index on this field for filtering and sorting'),
+        ),
+        migrations.AddField(
+            model_name='contenttypefield',
+            name='sort_order',
+            field=models.IntegerField(choices=[(1, 'Ascending'), (-1, 'Descending')], default=1),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content_types_app', '0002_contenttypefield_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contenttype',
+            name='storage_mode',
+            field=models.CharField(choices=[('shared', 'Shared collection (dynamic_contents)'), ('dedicated', 'Dedicated collection (content_<name>)')], default='shared', help_text='Move existing content types with "manage.py migrate_content_storage"', max_length=20),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.1 on 2026-10-17 02:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content_types_app', '0003_contenttype_storage_mode'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='contenttypefield',
+            name='search_weight',
+            field=models.PositiveIntegerField(default=0, help_text='Relevance weight in full-text search (text and textarea fields, 0 to exclude)'),
+        ),
+    ]
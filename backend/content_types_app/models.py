@@ -37,6 +37,19 @@ class ContentType(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     is_active = models.BooleanField(default=True)
     
+    # Where the entries live in MongoDB
+    STORAGE_MODE_CHOICES = [
+        ('shared', 'Shared collection (dynamic_contents)'),
+        ('dedicated', 'Dedicated collection (content_<name>)'),
+    ]
+    
+    storage_mode = models.CharField(
+        max_length=20,
+        choices=STORAGE_MODE_CHOICES,
+        default='shared',
+        help_text='Move existing content types with "manage.py migrate_content_storage"'
+    )
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Content Type'
@@ -93,6 +106,36 @@ class ContentTypeField(models.Model):
     # Field ordering
     order = models.IntegerField(default=0)
     
+    # MongoDB index on (content_type, field) within dynamic_contents
+    SORT_ORDER_CHOICES = [
+        (1, 'Ascending'),
+        (-1, 'Descending'),
+    ]
+    INDEX_STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('building', 'Building'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+    
+    indexed = models.BooleanField(
+        default=False,
+        help_text='Maintain a MongoDB index on this field for filtering and sorting'
+    )
+    sort_order = models.IntegerField(choices=SORT_ORDER_CHOICES, default=1)
+    index_status = models.CharField(
+        max_length=20,
+        choices=INDEX_STATUS_CHOICES,
+        blank=True,
+        editable=False
+    )
+    
+    # Full-text search over text and textarea fields
+    search_weight = models.PositiveIntegerField(
+        default=0,
+        help_text='Relevance weight in full-text search (text and textarea fields, 0 to exclude)'
+    )
+    
     created_at = models.DateTimeField(auto_now_add=True)
     
     class Meta:
@@ -37,11 +37,9 @@ class ContentTypeSerializer(serializers.ModelSerializer):
 
 class ContentTypeListSerializer(serializers.ModelSerializer):
     """Simplified serializer for listing content types"""
-    field_count = serializers.SerializerMethodField()
+    # Annotated by ContentTypeViewSet.get_queryset with Count('fields')
+    field_count = serializers.IntegerField(read_only=True)
     
     class Meta:
         model = ContentType
         fields = ['id', 'name', 'display_name', 'description', 'is_active', 'field_count', 'created_at']
-    
-    def get_field_count(self, obj):
-        return obj.fields.count()
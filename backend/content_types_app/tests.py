@@ -0,0 +1,72 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+from .models import ContentType, ContentTypeField
+
+
+class ContentTypeQueryCountTests(TestCase):
+    """The content type endpoints run a fixed number of queries"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.add_content_types(3, 4)
+        cls.content_type = ContentType.objects.get(name='type_1')
+
+    @classmethod
+    def add_content_types(cls, count, field_count):
+        start = ContentType.objects.count()
+        for i in range(start, start + count):
+            content_type = ContentType.objects.create(
+                name=f'type_{i}', display_name=f'Type {i}')
+            for j in range(field_count):
+                ContentTypeField.objects.create(
+                    content_type=content_type,
+                    field_name=f'field_{j}',
+                    display_name=f'Field {j}',
+                    field_type=('text', 'number', 'boolean', 'date')[j % 4]
+                )
+
+    def add_fields(self, content_type, count):
+        start = content_type.fields.count()
+        for j in range(start, start + count):
+            ContentTypeField.objects.create(
+                content_type=content_type,
+                field_name=f'field_{j}',
+                display_name=f'Field {j}',
+                field_type='text'
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def assert_list_queries(self, type_count, field_count):
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/content-types/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data), type_count)
+        self.assertEqual({item['field_count'] for item in response.data}, {field_count})
+
+    def assert_detail_queries(self, path, field_count):
+        # ETag lookup, content type, prefetched fields
+        for identifier in (self.content_type.name, self.content_type.pk):
+            with self.assertNumQueries(3):
+                response = self.client.get(f'/api/content-types/{identifier}/{path}')
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.data['fields']), field_count)
+
+    # Each count is checked again after adding rows, so a query per row fails
+
+    def test_list(self):
+        self.assert_list_queries(3, 4)
+        self.add_content_types(7, 4)
+        self.assert_list_queries(10, 4)
+
+    def test_retrieve(self):
+        self.assert_detail_queries('', 4)
+        self.add_fields(self.content_type, 8)
+        self.assert_detail_queries('', 12)
+
+    def test_schema(self):
+        self.assert_detail_queries('schema/', 4)
+        self.add_fields(self.content_type, 8)
+        self.add_content_types(5, 6)
+        self.assert_detail_queries('schema/', 12)
@@ -1,42 +1,83 @@
+from django.db.models import Count, Q
+from django.http import Http404
+from django.shortcuts import get_object_or_404
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from .models import ContentType, ContentTypeField
+from dynamic_form_project.conditional import conditional, make_etag
+from .models import ContentType
 from .serializers import ContentTypeSerializer, ContentTypeListSerializer
 
 
+def lookup_filter(pk):
+    """
+    Match a content type by primary key or by name. Names must start with a
+    letter, so a numeric identifier can only be a primary key.
+    """
+    if str(pk).isdigit():
+        return Q(pk=pk)
+    return Q(name=pk)
+
+
+def schema_validators(request, pk=None):
+    """
+    ETag / Last-Modified of a content type's schema. Field changes bump
+    ContentType.updated_at, so one indexed lookup covers the whole schema.
+    """
+    updated_at = ContentType.objects.filter(
+        lookup_filter(pk), is_active=True
+    ).values_list('updated_at', flat=True).first()
+    if updated_at is None:
+        return None
+
+    etag = make_etag(
+        request.get_full_path(),
+        updated_at.isoformat(),
+        request.META.get('HTTP_ACCEPT', '')
+    )
+    return etag, updated_at
+
+
 class ContentTypeViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoint for viewing content types and their schema definitions
     """
     queryset = ContentType.objects.filter(is_active=True)
     
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == 'list':
+            return queryset.annotate(field_count=Count('fields'))
+        return queryset.prefetch_related('fields')
+    
     def get_serializer_class(self):
         if self.action == 'list':
             return ContentTypeListSerializer
         return ContentTypeSerializer
     
+    def get_object(self):
+        """Get a specific content type by ID or name in a single query"""
+        instance = get_object_or_404(
+            self.get_queryset(), lookup_filter(self.kwargs['pk']))
+        self.check_object_permissions(self.request, instance)
+        return instance
+    
+    @conditional(schema_validators)
     def retrieve(self, request, *args, **kwargs):
         """Get a specific content type by ID or name"""
-        pk = kwargs.get('pk')
-        
-        # Try to get by ID first
         try:
-            instance = ContentType.objects.get(pk=pk, is_active=True)
-        except (ContentType.DoesNotExist, ValueError):
-            # If not found or not a valid ID, try by name
-            try:
-                instance = ContentType.objects.get(name=pk, is_active=True)
-            except ContentType.DoesNotExist:
-                return Response(
-                    {'error': 'Content type not found'}, 
-                    status=status.HTTP_404_NOT_FOUND
-                )
+            instance = self.get_object()
+        except Http404:
+            return Response(
+                {'error': 'Content type not found'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
         
         serializer = self.get_serializer(instance)
         return Response(serializer.data)
     
     @action(detail=True, methods=['get'])
+    @conditional(schema_validators)
     def schema(self, request, pk=None):
         """Get the JSON schema for a content type"""
         content_type = self.get_object()
@@ -0,0 +1,196 @@
+"""
+Counts, sums, averages and min/max per group over a content type
+
+A request such as
+
+    ?group_by=status,published_on:month&metrics=count,sum:price,max:price&flag=true
+
+is checked against the content type schema and compiled into one $match /
+$group pipeline that runs in MongoDB. Results are kept in the content cache
+(see response_cache.py) under the content type's write version, so they are
+reused until an entry of the content type is written.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+from .query import build_query
+from .response_cache import get_content_cache, cache_metrics
+from .stats import get_stats
+
+
+GROUP_BY_PARAM = 'group_by'
+METRICS_PARAM = 'metrics'
+
+# Query parameters of the aggregate endpoint that are not filters
+AGGREGATE_RESERVED_PARAMS = (GROUP_BY_PARAM, METRICS_PARAM, 'format')
+
+GROUPABLE_FIELD_TYPES = ('number', 'select', 'boolean', 'date')
+
+# Accumulators and the field types they apply to
+METRIC_FIELD_TYPES = {
+    'sum': ('number',),
+    'avg': ('number',),
+    'min': ('number', 'date'),
+    'max': ('number', 'date'),
+}
+
+# Date fields are stored as ISO strings, so a granularity is a prefix length
+DATE_GRANULARITIES = {'year': 4, 'month': 7, 'day': 10}
+
+# Formats of the same granularities for the datetime system fields
+SYSTEM_DATE_FORMATS = {'year': '%Y', 'month': '%Y-%m', 'day': '%Y-%m-%d'}
+
+SYSTEM_DATE_FIELDS = ('created_at', 'updated_at')
+
+MAX_GROUP_BY_FIELDS = 3
+
+
+def _field_type(schema, field_name):
+    if field_name in SYSTEM_DATE_FIELDS:
+        return 'date'
+    field = schema.fields_by_name.get(field_name)
+    return field.field_type if field is not None else None
+
+
+def _group_expression(schema, key):
+    """Return (field_name, $group key expression) for one group_by entry"""
+    field_name, _, granularity = key.partition(':')
+    field_type = _field_type(schema, field_name)
+
+    if field_type is None:
+        raise ValidationError({GROUP_BY_PARAM: f"Unknown field '{field_name}'"})
+    if field_type not in GROUPABLE_FIELD_TYPES:
+        raise ValidationError({
+            GROUP_BY_PARAM: f"Can't group by {field_type} field '{field_name}'"})
+
+    if not granularity:
+        return field_name, f'${field_name}'
+    if field_type != 'date' or granularity not in DATE_GRANULARITIES:
+        raise ValidationError({
+            GROUP_BY_PARAM: f"Invalid granularity '{granularity}' for '{field_name}', "
+                            f"expected one of: {', '.join(DATE_GRANULARITIES)}"
+        })
+
+    if field_name in SYSTEM_DATE_FIELDS:
+        return field_name, {'$dateToString': {
+            'format': SYSTEM_DATE_FORMATS[granularity], 'date': f'${field_name}'}}
+    return field_name, {'$cond': [
+        {'$eq': [{'$type': f'${field_name}'}, 'string']},
+        {'$substrCP': [f'${field_name}', 0, DATE_GRANULARITIES[granularity]]},
+        None
+    ]}
+
+
+def parse_group_by(schema, group_by_param):
+    """Parse ?group_by=a,b:month into {field name: $group key expression}"""
+    group = {}
+    if not group_by_param:
+        return group
+
+    for key in group_by_param.split(','):
+        key = key.strip()
+        if not key:
+            continue
+        field_name, expression = _group_expression(schema, key)
+        if field_name in group:
+            raise ValidationError({GROUP_BY_PARAM: f"'{field_name}' is grouped by twice"})
+        group[field_name] = expression
+
+    if len(group) > MAX_GROUP_BY_FIELDS:
+        raise ValidationError({
+            GROUP_BY_PARAM: f"At most {MAX_GROUP_BY_FIELDS} fields can be grouped by"})
+    return group
+
+
+def parse_metrics(schema, metrics_param):
+    """Parse ?metrics=count,sum:price into {result key: accumulator}"""
+    metrics = {}
+    errors = []
+
+    for key in (metrics_param or 'count').split(','):
+        key = key.strip()
+        if not key:
+            continue
+        if key == 'count':
+            metrics['count'] = {'$sum': 1}
+            continue
+
+        operator, _, field_name = key.partition(':')
+        field_type = _field_type(schema, field_name)
+        if operator not in METRIC_FIELD_TYPES:
+            errors.append(f"Unknown metric '{operator}'")
+        elif field_type is None:
+            errors.append(f"Unknown field '{field_name}'")
+        elif field_type not in METRIC_FIELD_TYPES[operator]:
+            errors.append(f"Can't compute {operator} of {field_type} field '{field_name}'")
+        else:
+            metrics[f'{operator}_{field_name}'] = {f'${operator}': f'${field_name}'}
+
+    if errors:
+        raise ValidationError({METRICS_PARAM: errors})
+    if not metrics:
+        raise ValidationError({METRICS_PARAM: 'Expected at least one metric'})
+    return metrics
+
+
+def build_pipeline(schema, query_params):
+    """Compile an aggregate request into a Mongo aggregation pipeline"""
+    query = build_query(schema, query_params, reserved=AGGREGATE_RESERVED_PARAMS)
+    group = parse_group_by(schema, query_params.get(GROUP_BY_PARAM))
+    metrics = parse_metrics(schema, query_params.get(METRICS_PARAM))
+
+    return [
+        {'$match': query},
+        {'$group': dict(metrics, _id=group or None)},
+        {'$sort': {'_id': 1}},
+        # One more than allowed, to tell when there are too many groups
+        {'$limit': settings.CONTENT_AGGREGATE_MAX_GROUPS + 1},
+    ]
+
+
+def _cache_key(schema, version, pipeline):
+    digest = hashlib.md5(
+        json.dumps(pipeline, sort_keys=True, default=str).encode(),
+        usedforsecurity=False
+    ).hexdigest()
+    return f'content-aggregate:{schema.name}:{schema.version.timestamp()}:{version}:{digest}'
+
+
+def _run(collection, pipeline, group_by):
+    groups = list(collection.aggregate(pipeline))
+    if len(groups) > settings.CONTENT_AGGREGATE_MAX_GROUPS:
+        raise ValidationError({
+            GROUP_BY_PARAM: f"More than {settings.CONTENT_AGGREGATE_MAX_GROUPS} groups, "
+                            f"narrow the filter or group by fewer fields"
+        })
+
+    results = []
+    for group in groups:
+        # Entries missing a grouped field come out as null, like in MongoDB
+        key = group.pop('_id') or {}
+        results.append(dict(group={name: key.get(name) for name in group_by}, **group))
+    return results
+
+
+def aggregate(collection, schema, query_params):
+    """
+    Return the groups of an aggregate request, each as
+    {"group": {field: value}, "count": ..., "<operator>_<field>": ...}
+    """
+    pipeline = build_pipeline(schema, query_params)
+    group_by = pipeline[1]['$group']['_id'] or {}
+
+    # A write to the content type bumps the version, so old entries are never read again
+    key = _cache_key(schema, get_stats(schema.name).get('version', 0), pipeline)
+    cache = get_content_cache()
+    results = cache.get(key)
+    if results is not None:
+        cache_metrics.hit('aggregations')
+        return results
+
+    cache_metrics.miss('aggregations')
+    results = _run(collection, pipeline, group_by)
+    cache.set(key, results, settings.CONTENT_AGGREGATE_CACHE_TTL)
+    return results
@@ -4,3 +4,10 @@ from django.apps import AppConfig
 class DynamicContentAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'dynamic_content_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from .mongodb import register_mongodb_connection
+
+        # Only records the settings, clients are created per process on first use
+        register_mongodb_connection()
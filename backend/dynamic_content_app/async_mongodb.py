@@ -0,0 +1,50 @@
+"""
+Motor (asyncio MongoDB driver) access for the async content views
+
+Motor clients are bound to the event loop they were first used on, so one
+client is kept per running loop. Under an ASGI server that is one client per
+process, sharing its connection pool between all in-flight requests.
+"""
+import asyncio
+import os
+import weakref
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from .mongodb import (
+    DynamicContent,
+    ContentTypeStats,
+    mongodb_host_settings,
+    mongodb_client_options
+)
+
+
+_databases = weakref.WeakKeyDictionary()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_databases.clear)
+
+
+def _create_client():
+    host_settings = mongodb_host_settings()
+    host_settings.pop('db', None)
+    return AsyncIOMotorClient(**host_settings, **mongodb_client_options())
+
+
+def get_async_database():
+    """Return the Motor database of the running event loop"""
+    loop = asyncio.get_running_loop()
+    database = _databases.get(loop)
+    if database is None:
+        # Same database MongoEngine resolved from MONGODB_SETTINGS
+        database = _create_client().get_database(DynamicContent._get_db().name)
+        _databases[loop] = database
+    return database
+
+
+def get_async_content_collection(collection_name=None):
+    """Motor counterpart of get_content_collection()"""
+    return get_async_database()[collection_name or DynamicContent._get_collection_name()]
+
+
+def get_async_stats_collection():
+    return get_async_database()[ContentTypeStats._get_collection_name()]
@@ -0,0 +1,179 @@
+"""
+Native async versions of the content read views, backed by Motor
+
+Enabled with CONTENT_ASYNC_VIEWS when serving through asgi.py. JSON reads of
+the overview, list and detail endpoints run on the event loop and don't hold
+a thread while MongoDB answers. Writes and the other formats (browsable API,
+MessagePack, BSON) are handed over to the DRF views in views.py.
+"""
+from asgiref.sync import sync_to_async
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+from content_types_app.models import ContentType
+from dynamic_form_project.conditional import conditional
+from .async_mongodb import get_async_content_collection
+from .mongodb import document_to_dict
+from .pagination import apaginate
+from .query import (
+    build_query,
+    parse_fields,
+    field_projection,
+    parse_sort,
+    acheck_sort
+)
+from .response_cache import cached_response, arequest_stats
+from .stats import aget_counts
+from .validators import aget_content_schema
+from .views import (
+    DynamicContentListView,
+    DynamicContentDetailView,
+    ContentTypeDataView,
+    content_etag,
+    content_last_modified
+)
+
+
+# Same output as DRF's JSONRenderer
+JSON_DUMPS_PARAMS = {'separators': (',', ':'), 'ensure_ascii': False, 'allow_nan': False}
+
+
+def _json_response(data, status=200):
+    return JsonResponse(
+        data, status=status, safe=False, encoder=JSONEncoder,
+        json_dumps_params=JSON_DUMPS_PARAMS)
+
+
+def _serves_json(request):
+    """Whether the client negotiates plain JSON (and not e.g. the browsable API)"""
+    format_param = request.GET.get('format')
+    if format_param:
+        return format_param == 'json'
+    accept = request.headers.get('Accept', '').strip()
+    return accept in ('', '*/*') or 'application/json' in accept
+
+
+async def acontent_validators(request, content_type_name, content_id=None):
+    """content_validators() through Motor, producing the same ETags"""
+    try:
+        schema = await aget_content_schema(content_type_name)
+    except ValidationError:
+        return None
+    stats = await arequest_stats(request, content_type_name)
+    return content_etag(request, schema, stats), content_last_modified(schema, stats)
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AsyncContentView(View):
+    """
+    Serve JSON GETs with the subclass's async read() and pass everything
+    else on to the synchronous DRF view
+    """
+    sync_view = None
+
+    async def delegate(self, request, *args, **kwargs):
+        return await sync_to_async(type(self).sync_view)(request, *args, **kwargs)
+
+    post = put = patch = delete = delegate
+
+    async def get(self, request, *args, **kwargs):
+        if not _serves_json(request):
+            return await self.delegate(request, *args, **kwargs)
+        try:
+            return await self.read(request, *args, **kwargs)
+        except ValidationError as e:
+            return _json_response(e.detail, status=400)
+
+
+class AsyncDynamicContentListView(AsyncContentView):
+    """
+    List content for a specific content type
+    """
+    sync_view = DynamicContentListView.as_view()
+
+    @conditional(acontent_validators)
+    @cached_response
+    async def read(self, request, content_type_name):
+        """Get a page of content entries for a content type"""
+        try:
+            schema = await aget_content_schema(content_type_name)
+        except ValidationError:
+            return _json_response(
+                {'error': f"Content type '{content_type_name}' not found"},
+                status=404
+            )
+
+        collection = get_async_content_collection(schema.collection_name)
+        query = build_query(schema, request.GET)
+        sort = parse_sort(schema, request.GET.get('sort'))
+        await acheck_sort(schema, sort, collection)
+
+        fields = parse_fields(schema, request.GET.get('fields'))
+        projection = field_projection(fields, sort)
+
+        documents, next_cursor = await apaginate(
+            collection, query, request, sort, projection)
+        results = [document_to_dict(document, fields) for document in documents]
+
+        return _json_response({
+            'content_type': content_type_name,
+            'count': len(results),
+            'next': next_cursor,
+            'results': results
+        })
+
+
+class AsyncDynamicContentDetailView(AsyncContentView):
+    """
+    Retrieve a specific content entry
+    """
+    sync_view = DynamicContentDetailView.as_view()
+
+    @conditional(acontent_validators)
+    @cached_response
+    async def read(self, request, content_type_name, content_id):
+        """Get a specific content entry"""
+        try:
+            schema = await aget_content_schema(content_type_name)
+        except ValidationError:
+            return _json_response({'error': 'Content not found'}, status=404)
+        fields = parse_fields(schema, request.GET.get('fields'))
+
+        try:
+            document = await get_async_content_collection(schema.collection_name).find_one(
+                {'_id': ObjectId(content_id), 'content_type': content_type_name},
+                field_projection(fields)
+            )
+        except InvalidId:
+            document = None
+
+        if document is None:
+            return _json_response({'error': 'Content not found'}, status=404)
+
+        return _json_response(document_to_dict(document, fields))
+
+
+class AsyncContentTypeDataView(AsyncContentView):
+    """
+    Get all content for all content types (overview)
+    """
+    sync_view = ContentTypeDataView.as_view()
+
+    async def read(self, request):
+        """Get summary of all content types and their counts"""
+        content_types = [ct async for ct in ContentType.objects.filter(is_active=True)]
+        counts = await aget_counts(ct.name for ct in content_types)
+
+        return _json_response([
+            {
+                'content_type': ct.name,
+                'display_name': ct.display_name,
+                'count': counts.get(ct.name, 0)
+            }
+            for ct in content_types
+        ])
@@ -0,0 +1,82 @@
+"""
+Process-local background worker for maintenance jobs (index builds and the like)
+
+Jobs run after the surrounding transaction commits, one at a time per queue:
+each queue has its own worker thread, so long jobs such as schema rewrites
+don't hold up index builds. Setting CONTENT_BACKGROUND_TASKS to False runs
+them inline instead, which is handy for management commands and debugging.
+"""
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_QUEUE = 'maintenance'
+
+_executors = {}
+_lock = threading.Lock()
+
+
+def _get_executor(queue):
+    with _lock:
+        executor = _executors.get(queue)
+        if executor is None:
+            executor = _executors[queue] = ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix=f'dynamic-content-{queue}')
+        return executor
+
+
+def _run(job, *args):
+    try:
+        job(*args)
+    except Exception:
+        logger.exception('Background job %s failed', job.__name__)
+
+
+def _run_on_worker(job, *args):
+    try:
+        _run(job, *args)
+    finally:
+        # The worker thread owns its own database connection
+        close_old_connections()
+
+
+def _reset_after_fork():
+    # Worker threads and timers don't exist in a forked child
+    global _executors, _lock
+    _executors = {}
+    _lock = threading.Lock()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def run_in_background(job, *args, queue=DEFAULT_QUEUE, delay=0):
+    """
+    Run job(*args) on a queue's worker once the current transaction commits,
+    delay seconds later if given. Inline runs don't wait for the delay.
+    """
+    if not settings.CONTENT_BACKGROUND_TASKS:
+        transaction.on_commit(lambda: _run(job, *args))
+        return
+
+    def submit():
+        _get_executor(queue).submit(_run_on_worker, job, *args)
+
+    if not delay:
+        transaction.on_commit(submit)
+        return
+
+    def start_timer():
+        timer = threading.Timer(delay, submit)
+        timer.daemon = True
+        timer.start()
+
+    transaction.on_commit(start_timer)
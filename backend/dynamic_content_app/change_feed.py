@@ -0,0 +1,249 @@
+"""
+Server-Sent Events feed of the changes to a content type
+
+GET /api/content/<type>/changes/ keeps the connection open and sends one
+event per created, updated or deleted entry, so clients stop polling the
+list. It only answers requests served through asgi.py: a WSGI server would
+read the endless stream to the end before sending anything.
+
+Events come from a MongoDB change stream when the server supports them
+(replica sets and sharded clusters) and from the in-process hub in
+changes.py otherwise; CONTENT_CHANGES_SOURCE forces either. Deletes carry no
+document, so change streams on the shared collection need its pre-images to
+tell which content type a delete belongs to. The feed enables them (MongoDB
+6.0+) and in auto mode falls back to the hub for shared content types when
+that isn't possible. Every event
+carries an id. EventSource sends the last one back in the Last-Event-ID
+header when it reconnects (or pass ?last_event_id=) and the feed resumes
+after it. When that is no longer possible a `reset` event tells the client
+to reload instead.
+"""
+import asyncio
+import json
+import logging
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from pymongo.errors import OperationFailure, PyMongoError
+from rest_framework.exceptions import ValidationError
+from rest_framework.utils.encoders import JSONEncoder
+from .async_mongodb import get_async_database, get_async_content_collection
+from .changes import hub, change_event
+from .mongodb import SHARED_COLLECTION, document_to_dict
+from .validators import aget_content_schema
+
+
+logger = logging.getLogger(__name__)
+
+# Change stream operations and the feed operations they are sent as
+OPERATIONS = {'insert': 'create', 'update': 'update', 'replace': 'update', 'delete': 'delete'}
+
+# Wire version of MongoDB 6.0, the first with change stream pre-images
+PRE_IMAGES_WIRE_VERSION = 17
+
+KEEPALIVE = ': keepalive\n\n'
+
+# What the server offers, checked once per process
+_server_features = None
+
+# Whether the shared collection records pre-images, None until tried
+_pre_images_enabled = None
+
+
+async def _get_server_features():
+    global _server_features
+    if _server_features is None:
+        try:
+            hello = await get_async_database().client.admin.command('hello')
+        except PyMongoError:
+            # Try again on the next connection, use the hub meanwhile
+            return {'change_streams': False, 'pre_images': False}
+        _server_features = {
+            'change_streams': 'setName' in hello or hello.get('msg') == 'isdbgrid',
+            'pre_images': hello.get('maxWireVersion', 0) >= PRE_IMAGES_WIRE_VERSION,
+        }
+    return _server_features
+
+
+async def _enable_pre_images():
+    """
+    Turn on pre-images of the shared collection once per process; returns
+    whether delete events of its content types can be matched
+    """
+    global _pre_images_enabled
+    if _pre_images_enabled is None:
+        try:
+            await get_async_database().command(
+                'collMod', SHARED_COLLECTION, changeStreamPreAndPostImages={'enabled': True})
+        except PyMongoError as e:
+            # E.g. a user without the collMod privilege: enable them by hand
+            logger.warning('Could not enable pre-images of %s: %s', SHARED_COLLECTION, e)
+            _pre_images_enabled = False
+        else:
+            _pre_images_enabled = True
+    return _pre_images_enabled
+
+
+def _sse(data, event_id=None, event_type=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f'id: {event_id}')
+    if event_type is not None:
+        lines.append(f'event: {event_type}')
+    lines.append('data: ' + json.dumps(data, cls=JSONEncoder, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+def _reset(content_type_name, event_id):
+    return _sse({'content_type': content_type_name}, event_id, 'reset')
+
+
+async def _hub_events(content_type_name, last_event_id):
+    """Events published by this process's write paths"""
+    wakeup = hub.subscribe(content_type_name)
+    try:
+        sequence = hub.parse_event_id(last_event_id)
+        if sequence is None:
+            sequence = hub.last_sequence()
+            if last_event_id:
+                yield _reset(content_type_name, hub.event_id(sequence))
+
+        while True:
+            wakeup.clear()
+            events = hub.since(content_type_name, sequence)
+            if events is None:
+                # The client was away longer than the buffer reaches back
+                sequence = hub.last_sequence()
+                yield _reset(content_type_name, hub.event_id(sequence))
+                continue
+
+            for sequence, event in events:
+                yield _sse(event, hub.event_id(sequence))
+
+            if not events:
+                try:
+                    await asyncio.wait_for(
+                        wakeup.wait(), settings.CONTENT_CHANGES_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    yield KEEPALIVE
+    finally:
+        hub.unsubscribe(content_type_name, wakeup)
+
+
+def _change_to_event(content_type_name, change):
+    operation = OPERATIONS[change['operationType']]
+    document = change.get('fullDocument')
+    return change_event(
+        content_type_name,
+        operation,
+        change['documentKey']['_id'],
+        document_to_dict(document) if operation != 'delete' and document else None
+    )
+
+
+async def _change_stream_events(schema, last_event_id, pre_images):
+    """Events from a MongoDB change stream on the content type's collection"""
+    name = schema.name
+    options = {
+        'full_document': 'updateLookup',
+        'max_await_time_ms': settings.CONTENT_CHANGES_HEARTBEAT * 1000,
+    }
+    match = {'operationType': {'$in': list(OPERATIONS)}}
+    if schema.collection_name == SHARED_COLLECTION:
+        # Deletes carry no document, so in the shared collection they can
+        # only be told apart with pre-images (changeStreamPreAndPostImages)
+        match['$or'] = [{'fullDocument.content_type': name}]
+        if pre_images:
+            options['full_document_before_change'] = 'whenAvailable'
+            match['$or'].append({'fullDocumentBeforeChange.content_type': name})
+
+    # Hub ids contain a dot, resume tokens don't
+    resume_token = last_event_id if last_event_id and '.' not in last_event_id else None
+    needs_reset = bool(last_event_id) and resume_token is None
+
+    collection = get_async_content_collection(schema.collection_name)
+    while True:
+        resume_after = {'_data': resume_token} if resume_token else None
+        try:
+            async with collection.watch(
+                    [{'$match': match}], resume_after=resume_after, **options) as stream:
+                if needs_reset:
+                    needs_reset = False
+                    token = stream.resume_token
+                    yield _reset(name, token['_data'] if token else None)
+
+                while stream.alive:
+                    change = await stream.try_next()
+                    if change is None:
+                        yield KEEPALIVE
+                        continue
+                    resume_token = change['_id']['_data']
+                    yield _sse(_change_to_event(name, change), resume_token)
+        except OperationFailure:
+            if resume_after is None:
+                raise
+            # The token fell off the oplog (or is from another deployment)
+            resume_token = None
+            needs_reset = True
+
+
+async def _with_retry(events):
+    # How long EventSource waits before reconnecting
+    try:
+        yield f'retry: {settings.CONTENT_CHANGES_RETRY_MS}\n\n'
+        async for chunk in events:
+            yield chunk
+    finally:
+        # Closes the change stream or leaves the hub when the client goes away
+        await events.aclose()
+
+
+class ContentChangesView(View):
+    """
+    Server-Sent Events stream of the changes to a content type. Needs an
+    ASGI server; requests served through WSGI get a 501.
+    """
+
+    async def get(self, request, content_type_name):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse(
+                {'error': 'The change feed needs the app to be served through ASGI (asgi.py)'},
+                status=501
+            )
+
+        try:
+            schema = await aget_content_schema(content_type_name)
+        except ValidationError:
+            return JsonResponse(
+                {'error': f"Content type '{content_type_name}' not found"},
+                status=404
+            )
+
+        last_event_id = (
+            request.headers.get('Last-Event-ID') or request.GET.get('last_event_id'))
+
+        features = await _get_server_features()
+        source = settings.CONTENT_CHANGES_SOURCE
+        use_streams = source == 'change_streams' or (
+            source == 'auto' and features['change_streams'])
+        pre_images = use_streams and features['pre_images'] and await _enable_pre_images()
+        if source == 'auto' and schema.collection_name == SHARED_COLLECTION and not pre_images:
+            # A change stream would miss the deletes of the content type
+            use_streams = False
+
+        if use_streams:
+            if pre_images or source == 'change_streams':
+                # No feed of this process reads the hub any more
+                hub.active = False
+            events = _change_stream_events(schema, last_event_id, pre_images)
+        else:
+            events = _hub_events(content_type_name, last_event_id)
+
+        response = StreamingHttpResponse(
+            _with_retry(events), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Keep nginx from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
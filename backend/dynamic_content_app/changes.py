@@ -0,0 +1,166 @@
+"""
+In-process publish hook for content changes
+
+The write paths in views.py publish what they changed here. The change feed
+(see change_feed.py) reads MongoDB change streams when the server offers
+them and falls back to this hub otherwise, e.g. on a standalone server. The
+hub only sees writes made by its own process, so the fallback suits single
+process deployments.
+
+Each content type keeps its last CONTENT_CHANGES_BUFFER events, so a client
+that reconnects with the id of the last event it received gets what it
+missed. Ids are "<process token>.<sequence>"; ids of another process (or of
+this one before a restart or fork) can't be resumed from.
+"""
+import asyncio
+import collections
+import os
+import secrets
+import threading
+
+from django.conf import settings
+from .mongodb import document_to_dict
+
+
+class ChangeHub:
+    """Recent changes per content type and the subscribers waiting for them"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            # Switched off once the feed reads change streams instead
+            self.active = settings.CONTENT_CHANGES_SOURCE != 'change_streams'
+            self.token = secrets.token_hex(4)
+            self._sequence = 0
+            self._events = {}
+            # Highest sequence number dropped from each content type's buffer
+            self._dropped = {}
+            self._waiters = {}
+
+    def event_id(self, sequence):
+        return f'{self.token}.{sequence}'
+
+    def parse_event_id(self, event_id):
+        """Return the sequence number of an event id of this process, or None"""
+        token, _, sequence = (event_id or '').partition('.')
+        if token != self.token or not sequence.isdigit():
+            return None
+        return int(sequence)
+
+    def last_sequence(self):
+        with self._lock:
+            return self._sequence
+
+    def publish(self, content_type_name, events, skipped=0):
+        """
+        Append events to the content type's buffer. `skipped` counts events
+        before them that were never built because they wouldn't fit; they
+        take sequence numbers and count as dropped.
+        """
+        if not events or not self.active:
+            return
+        with self._lock:
+            buffer = self._events.get(content_type_name)
+            if buffer is None:
+                buffer = self._events[content_type_name] = collections.deque(
+                    maxlen=settings.CONTENT_CHANGES_BUFFER)
+            if skipped:
+                self._sequence += skipped
+                self._dropped[content_type_name] = self._sequence
+                buffer.clear()
+            for event in events:
+                if len(buffer) == buffer.maxlen:
+                    self._dropped[content_type_name] = buffer[0][0]
+                self._sequence += 1
+                buffer.append((self._sequence, event))
+            waiters = list(self._waiters.get(content_type_name, ()))
+
+        for loop, wakeup in waiters:
+            loop.call_soon_threadsafe(wakeup.set)
+
+    def since(self, content_type_name, sequence):
+        """
+        Return the [(sequence, event)] published after a sequence number, or
+        None when some of them were already dropped from the buffer
+        """
+        with self._lock:
+            if self._dropped.get(content_type_name, 0) > sequence:
+                return None
+            return [
+                (number, event)
+                for number, event in self._events.get(content_type_name, ())
+                if number > sequence
+            ]
+
+    def subscribe(self, content_type_name):
+        """Return an asyncio.Event set whenever the content type changes"""
+        wakeup = asyncio.Event()
+        with self._lock:
+            self._waiters.setdefault(content_type_name, set()).add(
+                (asyncio.get_running_loop(), wakeup))
+        return wakeup
+
+    def unsubscribe(self, content_type_name, wakeup):
+        with self._lock:
+            waiters = self._waiters.get(content_type_name, set())
+            waiters.difference_update(
+                [waiter for waiter in waiters if waiter[1] is wakeup])
+
+
+hub = ChangeHub()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=hub.reset)
+
+
+def change_event(content_type_name, operation, content_id=None, data=None, count=None):
+    """The payload of a change feed event, the same for both sources"""
+    event = {'operation': operation, 'content_type': content_type_name}
+    if content_id is not None:
+        event['id'] = str(content_id)
+    if data is not None:
+        event['data'] = data
+    if count is not None:
+        event['count'] = count
+    return event
+
+
+def publish_created(content_type_name, documents):
+    """Publish a list of stored documents that were inserted"""
+    if not hub.active:
+        return
+    # Only the last CONTENT_CHANGES_BUFFER are kept, so don't serialize the rest
+    skipped = max(len(documents) - settings.CONTENT_CHANGES_BUFFER, 0)
+    entries = [document_to_dict(document) for document in documents[skipped:]]
+    hub.publish(content_type_name, [
+        change_event(content_type_name, 'create', entry['id'], entry) for entry in entries
+    ], skipped)
+
+
+def publish_updated(content_type_name, document):
+    if not hub.active:
+        return
+    entry = document_to_dict(document)
+    hub.publish(content_type_name, [
+        change_event(content_type_name, 'update', entry['id'], entry)
+    ])
+
+
+def publish_deleted(content_type_name, content_id):
+    hub.publish(content_type_name, [
+        change_event(content_type_name, 'delete', content_id)
+    ])
+
+
+def publish_bulk(content_type_name, operation, count):
+    """
+    Publish a bulk_update or bulk_delete by filter. The affected entries are
+    not known individually, so clients reload what they show.
+    """
+    if count:
+        hub.publish(content_type_name, [
+            change_event(content_type_name, operation, count=count)
+        ])
@@ -0,0 +1,390 @@
+"""
+Rewrites of stored entries after a content type's fields change
+
+Saving a field with a new field_type or field_name, or deleting it, records a
+job in the content_schema_migrations collection (see signals.py) and
+schedules it on the background worker:
+
+rename    move the value from the old to the new key
+convert   coerce the value with the new type's validation rules; values
+          that can't be converted are left as they are and reported
+remove    unset the key
+
+A job is due CONTENT_SCHEMA_TTL seconds after it was recorded (its
+start_at), once every process validates writes against the new schema, and
+runs on its own background queue so it never holds up index builds. Jobs of
+a content type run in the order they were recorded. Each one walks the
+affected entries in _id order, CONTENT_SCHEMA_MIGRATION_BATCH_SIZE at a time
+with one unordered bulk_write per batch, pausing
+CONTENT_SCHEMA_MIGRATION_PAUSE seconds in between. Progress is saved after
+every batch, so an interrupted job resumes where it stopped the next time
+jobs run. `manage.py migrate_content_schema` runs the due jobs, e.g. when
+background tasks are off.
+
+Reads and writes carry on meanwhile; entries not rewritten yet still show
+their old shape. Every rewrite is conditional on the entry's version and
+bumps it, so a concurrent edit is never overwritten: the entry is read
+again and rewritten from its new state.
+"""
+import datetime
+import logging
+import os
+import time
+
+from django.conf import settings
+from django.db import transaction
+from pymongo import ASCENDING, ReturnDocument, UpdateOne
+from content_types_app.models import ContentType, ContentTypeField
+from .background import run_in_background
+from .changes import publish_bulk
+from .mongodb import content_collection_name, get_content_collection
+from .stats import content_updated
+from .storage import CUTOVER_GRACE
+from .validators import CompiledField, FieldError
+
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_COLLECTION = 'content_schema_migrations'
+
+# Background queue of the rewrites, apart from index builds
+SCHEMA_QUEUE = 'schema'
+
+# A runner holds a job for this long, renewed after every batch; a job whose
+# runner died is picked up again once it expires
+LEASE_SECONDS = 60
+
+# Unconvertible values kept in the job document for review
+MAX_FAILURE_SAMPLES = 20
+
+# Attempts at rewriting an entry that keeps being edited concurrently
+MAX_CONFLICT_RETRIES = 5
+
+FINISHED = ('done', 'cancelled')
+
+
+def get_migrations_collection():
+    return get_content_collection().database[MIGRATIONS_COLLECTION]
+
+
+def field_operations(before, field):
+    """
+    The rewrites implied by saving a field whose stored state was before
+    (a (field_name, field_type) pair); field=None when it was deleted
+    """
+    old_name, old_type = before
+    if field is None:
+        return [{'op': 'remove', 'field': old_name}]
+
+    operations = []
+    if field.field_name != old_name:
+        operations.append({'op': 'rename', 'from': old_name, 'to': field.field_name})
+    if field.field_type != old_type:
+        operations.append({
+            'op': 'convert',
+            'field': field.field_name,
+            'from_type': old_type,
+            'to_type': field.field_type,
+            # What the coercer of the new type needs
+            'display_name': field.display_name,
+            'choices': field.choices,
+        })
+    return operations
+
+
+def _start_delay():
+    # Processes still on the old schema would write the old shape until then
+    return settings.CONTENT_SCHEMA_TTL + CUTOVER_GRACE
+
+
+def _create_job(content_type_id, content_type_name, operations):
+    now = datetime.datetime.utcnow()
+    get_migrations_collection().insert_one({
+        'content_type_id': content_type_id,
+        'content_type': content_type_name,
+        'operations': operations,
+        'status': 'pending',
+        'last_id': None,
+        'processed': 0,
+        'modified': 0,
+        'failed': 0,
+        'failures': [],
+        'created_at': now,
+        'updated_at': now,
+        'start_at': now + datetime.timedelta(seconds=_start_delay()),
+    })
+
+
+def schedule_schema_migration(content_type_id, content_type_name, operations):
+    """Record a job once the current transaction commits and run it in the background when due"""
+    if not operations:
+        return
+    transaction.on_commit(
+        lambda: _create_job(content_type_id, content_type_name, operations))
+    run_in_background(run_schema_migrations, queue=SCHEMA_QUEUE, delay=_start_delay())
+
+
+def _converter(operation):
+    """Coerce function of a convert operation, using the new type's rules"""
+    field = ContentTypeField(
+        field_name=operation['field'],
+        display_name=operation['display_name'],
+        field_type=operation['to_type'],
+        choices=operation['choices'],
+    )
+    return CompiledField(field).clean
+
+
+class SchemaMigration:
+    """Apply one recorded job to the entries of its content type"""
+
+    def __init__(self, job, batch_size=None, pause=None, log=logger.info):
+        self.job = job
+        self.name = job['content_type']
+        self.operations = job['operations']
+        self.batch_size = batch_size or settings.CONTENT_SCHEMA_MIGRATION_BATCH_SIZE
+        self.pause = settings.CONTENT_SCHEMA_MIGRATION_PAUSE if pause is None else pause
+        self.log = log
+        self.converters = {
+            operation['field']: _converter(operation)
+            for operation in self.operations if operation['op'] == 'convert'
+        }
+        self.owner = f'{os.getpid()}:{id(self)}'
+        self.batch_failures = {}
+
+    def _save(self, **changes):
+        now = datetime.datetime.utcnow()
+        changes['updated_at'] = now
+        changes['lease_until'] = now + datetime.timedelta(seconds=LEASE_SECONDS)
+        self.job.update(changes)
+        get_migrations_collection().update_one(
+            {'_id': self.job['_id'], 'owner': self.owner}, {'$set': changes})
+
+    def acquire(self):
+        """Take the job unless another runner holds it"""
+        now = datetime.datetime.utcnow()
+        job = get_migrations_collection().find_one_and_update(
+            {
+                '_id': self.job['_id'],
+                'status': {'$nin': list(FINISHED)},
+                '$or': [{'lease_until': None}, {'lease_until': {'$lt': now}}],
+            },
+            {'$set': {
+                'owner': self.owner,
+                'lease_until': now + datetime.timedelta(seconds=LEASE_SECONDS),
+            }},
+            return_document=ReturnDocument.AFTER
+        )
+        if job is None:
+            return False
+        self.job = job
+        return True
+
+    def _source_fields(self):
+        """Keys whose presence makes an entry a candidate for this job"""
+        fields = []
+        for operation in self.operations:
+            field = operation['from'] if operation['op'] == 'rename' else operation['field']
+            # A convert after a rename works on the renamed key
+            if operation['op'] == 'convert' and any(
+                    other['op'] == 'rename' and other['to'] == field for other in self.operations):
+                continue
+            fields.append(field)
+        return fields
+
+    def _projection(self):
+        projection = {'version': 1}
+        for operation in self.operations:
+            for key in ('from', 'to', 'field'):
+                if key in operation:
+                    projection[operation[key]] = 1
+        return projection
+
+    def rewrite(self, document):
+        """
+        Return ($set, $unset, failure) bringing a document to the new shape;
+        failure is (field, value) for a value that couldn't be converted
+        """
+        shaped = dict(document)
+        failure = None
+        for operation in self.operations:
+            if operation['op'] == 'rename':
+                if operation['from'] in shaped:
+                    value = shaped.pop(operation['from'])
+                    # A value already written under the new name wins
+                    shaped.setdefault(operation['to'], value)
+            elif operation['op'] == 'remove':
+                shaped.pop(operation['field'], None)
+            else:
+                field = operation['field']
+                value = shaped.get(field)
+                if value is None:
+                    continue
+                if value == '':
+                    # Empty values are not stored for non-text types
+                    del shaped[field]
+                    continue
+                try:
+                    shaped[field] = self.converters[field](value)
+                except FieldError:
+                    failure = (field, value)
+
+        changes = {
+            key: value for key, value in shaped.items()
+            if key not in document or type(document[key]) is not type(value)
+            or document[key] != value
+        }
+        removed = {key: '' for key in document if key not in shaped}
+        return changes, removed, failure
+
+    def _update(self, document):
+        """The conditional UpdateOne for a document, or None if it's already in shape"""
+        changes, removed, failure = self.rewrite(document)
+        if failure is not None:
+            # Keyed by entry so a retried entry is counted once
+            self.batch_failures[document['_id']] = failure
+        if not changes and not removed:
+            return None
+
+        update = {'$inc': {'version': 1}}
+        if changes:
+            update['$set'] = changes
+        if removed:
+            update['$unset'] = removed
+        # None matches entries written before versioning
+        return UpdateOne({'_id': document['_id'], 'version': document.get('version')}, update)
+
+    def _failure_samples(self):
+        samples = list(self.job['failures'])
+        for object_id, (field, value) in self.batch_failures.items():
+            if len(samples) >= MAX_FAILURE_SAMPLES:
+                break
+            samples.append({'id': str(object_id), 'field': field, 'value': value})
+        return samples
+
+    def _write(self, collection, documents):
+        """Rewrite a batch, retrying the entries edited since they were read"""
+        modified = 0
+        for _ in range(MAX_CONFLICT_RETRIES):
+            requests = []
+            pending = []
+            for document in documents:
+                request = self._update(document)
+                if request is not None:
+                    requests.append(request)
+                    pending.append(document)
+            if not requests:
+                break
+
+            result = collection.bulk_write(requests, ordered=False)
+            modified += result.modified_count
+            if result.matched_count == len(requests):
+                break
+
+            # Some entries were edited since they were read. Read them all
+            # again: the ones just rewritten are in shape now and drop out
+            documents = list(collection.find(
+                {'_id': {'$in': [document['_id'] for document in pending]}},
+                self._projection()))
+        return modified
+
+    def run(self):
+        """Process the remaining batches; returns False if the content type is gone"""
+        try:
+            content_type = ContentType.objects.get(pk=self.job['content_type_id'])
+        except ContentType.DoesNotExist:
+            self._save(status='cancelled', finished_at=datetime.datetime.utcnow())
+            return False
+
+        collection = get_content_collection(
+            content_collection_name(content_type.name, content_type.storage_mode))
+        query = {
+            'content_type': content_type.name,
+            '$or': [{field: {'$exists': True}} for field in self._source_fields()],
+        }
+        if self.job['status'] == 'pending':
+            self._save(
+                status='running',
+                started_at=datetime.datetime.utcnow(),
+                total=collection.count_documents(query)
+            )
+        self.log(f"{self.name}: {describe_operations(self.operations)}")
+
+        while True:
+            batch_query = dict(query)
+            if self.job['last_id'] is not None:
+                batch_query['_id'] = {'$gt': self.job['last_id']}
+            documents = list(
+                collection.find(batch_query, self._projection())
+                .sort('_id', ASCENDING).limit(self.batch_size))
+            if not documents:
+                break
+
+            self.batch_failures = {}
+            modified = self._write(collection, documents)
+            if modified:
+                # New write version: cached reads and ETags of the type expire
+                content_updated(content_type.name, modified)
+                publish_bulk(content_type.name, 'bulk_update', modified)
+
+            self._save(
+                last_id=documents[-1]['_id'],
+                processed=self.job['processed'] + len(documents),
+                modified=self.job['modified'] + modified,
+                failed=self.job['failed'] + len(self.batch_failures),
+                failures=self._failure_samples(),
+            )
+            self.log(
+                f"{self.name}: {self.job['processed']}/{self.job.get('total', '?')} entries, "
+                f"{self.job['modified']} rewritten, {self.job['failed']} not convertible")
+            if self.pause:
+                time.sleep(self.pause)
+
+        self._save(status='done', finished_at=datetime.datetime.utcnow())
+        return True
+
+
+def describe_operations(operations):
+    parts = []
+    for operation in operations:
+        if operation['op'] == 'rename':
+            parts.append(f"rename {operation['from']} to {operation['to']}")
+        elif operation['op'] == 'convert':
+            parts.append(
+                f"convert {operation['field']} from {operation['from_type']} "
+                f"to {operation['to_type']}")
+        else:
+            parts.append(f"remove {operation['field']}")
+    return ', '.join(parts)
+
+
+def unfinished_jobs(content_type_name=None):
+    query = {'status': {'$nin': list(FINISHED)}}
+    if content_type_name is not None:
+        query['content_type'] = content_type_name
+    return list(get_migrations_collection().find(query).sort('_id', ASCENDING))
+
+
+def run_schema_migrations(batch_size=None, pause=None, log=logger.info):
+    """
+    Run the due unfinished jobs in the order they were recorded. A content
+    type whose oldest job is not due yet or held by another runner is
+    skipped, so its jobs never run out of order. Returns the number of jobs
+    completed.
+    """
+    completed = 0
+    blocked = set()
+    now = datetime.datetime.utcnow()
+    for job in unfinished_jobs():
+        if job['content_type_id'] in blocked:
+            continue
+        if job['start_at'] > now:
+            blocked.add(job['content_type_id'])
+            continue
+        migration = SchemaMigration(job, batch_size=batch_size, pause=pause, log=log)
+        if not migration.acquire():
+            blocked.add(job['content_type_id'])
+            continue
+        migration.run()
+        completed += 1
+    return completed
@@ -0,0 +1,137 @@
+"""
+Streaming export of all entries of a content type as NDJSON or CSV
+
+Under WSGI rows come from a pymongo cursor; under ASGI from a Motor cursor,
+so in both cases only one cursor batch is held in memory.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.exceptions import ValidationError
+from .async_mongodb import get_async_content_collection
+from .mongodb import get_content_collection, document_to_dict
+from .validators import get_content_schema
+
+
+class Echo:
+    """File-like object whose write() hands the row back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def _find_documents(collection, schema, projection):
+    return collection.find(
+        {'content_type': schema.name},
+        projection,
+        batch_size=settings.CONTENT_EXPORT_BATCH_SIZE
+    )
+
+
+def _iter_documents(schema, projection=None):
+    cursor = _find_documents(
+        get_content_collection(schema.collection_name), schema, projection)
+    try:
+        for document in cursor:
+            yield document_to_dict(document)
+    finally:
+        cursor.close()
+
+
+async def _aiter_documents(schema, projection=None):
+    """_iter_documents() through Motor, on the event loop serving the response"""
+    cursor = _find_documents(
+        get_async_content_collection(schema.collection_name), schema, projection)
+    try:
+        async for document in cursor:
+            yield document_to_dict(document)
+    finally:
+        await cursor.close()
+
+
+def ndjson_format(schema):
+    """One JSON encoded entry per line"""
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    return None, None, lambda document: encoder.encode(document) + '\n'
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, cls=DjangoJSONEncoder)
+    return value
+
+
+def csv_format(schema):
+    """A header row followed by one row per entry, columns in field order"""
+    columns = ['id'] + [field.name for field in schema.fields] + ['created_at', 'updated_at']
+    projection = {column: 1 for column in columns if column != 'id'}
+    writer = csv.writer(Echo())
+    return projection, writer.writerow(columns), lambda document: writer.writerow(
+        [_csv_value(document.get(column)) for column in columns])
+
+
+# Format name: (function returning (projection, header, row renderer), media type)
+EXPORT_FORMATS = {
+    'ndjson': (ndjson_format, 'application/x-ndjson'),
+    'csv': (csv_format, 'text/csv'),
+}
+
+
+def iter_export(schema, export_format):
+    projection, header, render = EXPORT_FORMATS[export_format][0](schema)
+    if header is not None:
+        yield header
+    for document in _iter_documents(schema, projection):
+        yield render(document)
+
+
+async def aiter_export(schema, export_format):
+    """
+    iter_export() for ASGI. Django reads a sync iterator to the end before
+    an ASGI server sends anything, which would hold the export in memory.
+    """
+    projection, header, render = EXPORT_FORMATS[export_format][0](schema)
+    if header is not None:
+        yield header
+    async for document in _aiter_documents(schema, projection):
+        yield render(document)
+
+
+class DynamicContentExportView(View):
+    """
+    Stream every entry of a content type, ?format=ndjson (default) or csv
+    """
+
+    def get(self, request, content_type_name):
+        export_format = request.GET.get('format', 'ndjson')
+        if export_format not in EXPORT_FORMATS:
+            return JsonResponse(
+                {'error': f"Unsupported format '{export_format}', use one of: {', '.join(EXPORT_FORMATS)}"},
+                status=400
+            )
+
+        try:
+            schema = get_content_schema(content_type_name)
+        except ValidationError:
+            return JsonResponse(
+                {'error': f"Content type '{content_type_name}' not found"},
+                status=404
+            )
+
+        if isinstance(request, ASGIRequest):
+            rows = aiter_export(schema, export_format)
+        else:
+            rows = iter_export(schema, export_format)
+        response = StreamingHttpResponse(rows, content_type=EXPORT_FORMATS[export_format][1])
+        response['Content-Disposition'] = (
+            f'attachment; filename="{content_type_name}.{export_format}"')
+        return response
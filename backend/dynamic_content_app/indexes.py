@@ -0,0 +1,207 @@
+"""
+Per-field MongoDB indexes declared on ContentTypeField
+
+Every field flagged `indexed` gets a compound index (content_type, <field>,
+_id) in its content type's collection. In the shared dynamic_contents
+collection the index is partial, limited to the documents of its content
+type. The trailing _id matches the keyset pagination tie-breaker so filtered
+and sorted pages are served straight from the index.
+
+Each collection also gets one text index (MongoDB allows a single one per
+collection) over the text and textarea fields with a search weight, prefixed
+by content_type so searches stay within a content type. The shared
+collection's index covers the fields of all its content types.
+
+Indexes are reconciled as a whole: the desired set is computed from the
+schema, missing indexes are built, and managed indexes nobody asks for any
+more are dropped. Managed indexes are recognised by their name prefix.
+"""
+import logging
+import os
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from content_types_app.models import ContentType, ContentTypeField
+from .background import run_in_background
+from .mongodb import SHARED_COLLECTION, content_collection_name, get_content_collection
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_PREFIX = 'ct_'
+
+# Content type names never start with an underscore
+TEXT_INDEX_NAME = f"{INDEX_PREFIX}_text"
+
+# MongoDB takes a document's language from this field of the text index.
+# It defaults to `language`, a valid field name, so an entry of any content
+# type in the collection could set an unsupported language and have its
+# writes rejected; field names never start with an underscore.
+LANGUAGE_OVERRIDE = '_text_language'
+
+SEARCHABLE_FIELD_TYPES = ('text', 'textarea')
+
+_scheduled = threading.Event()
+
+if hasattr(os, 'register_at_fork'):
+    # A reconcile queued in the parent never runs in the child
+    os.register_at_fork(after_in_child=_scheduled.clear)
+
+
+def index_name(content_type_name, field_name):
+    return f"{INDEX_PREFIX}{content_type_name}__{field_name}"
+
+
+def field_index(field, collection_name):
+    """Return (keys, index options) of an indexed field in a collection"""
+    content_type_name = field.content_type.name
+    keys = [
+        ('content_type', 1),
+        (field.field_name, field.sort_order),
+        ('_id', field.sort_order),
+    ]
+    options = {'name': index_name(content_type_name, field.field_name)}
+    if collection_name == SHARED_COLLECTION:
+        options['partialFilterExpression'] = {'content_type': content_type_name}
+    return keys, options
+
+
+def text_index(fields):
+    """Return (keys, index options) of the text index over searchable fields, or None"""
+    weights = {}
+    for field in fields:
+        # Same field name in several content types of a collection: highest weight wins
+        weights[field.field_name] = max(field.search_weight, weights.get(field.field_name, 0))
+    if not weights:
+        return None
+
+    keys = [('content_type', 1)] + [(field_name, 'text') for field_name in sorted(weights)]
+    options = {
+        'name': TEXT_INDEX_NAME,
+        'weights': weights,
+        'default_language': settings.CONTENT_SEARCH_LANGUAGE,
+        'language_override': LANGUAGE_OVERRIDE,
+    }
+    return keys, options
+
+
+def searchable_fields(**filters):
+    return ContentTypeField.objects.filter(
+        field_type__in=SEARCHABLE_FIELD_TYPES, search_weight__gt=0, **filters
+    ).select_related('content_type')
+
+
+def desired_indexes():
+    """
+    Return {collection name: {index name: (fields, keys, options)}} for every
+    indexed field and text index, plus an empty entry for each collection in use
+    """
+    content_types = ContentType.objects.filter(is_active=True)
+    indexes = {SHARED_COLLECTION: {}}
+    for content_type in content_types:
+        indexes.setdefault(
+            content_collection_name(content_type.name, content_type.storage_mode), {})
+
+    fields = ContentTypeField.objects.filter(
+        indexed=True, content_type__is_active=True
+    ).select_related('content_type')
+
+    for field in fields:
+        content_type = field.content_type
+        collection_name = content_collection_name(content_type.name, content_type.storage_mode)
+        keys, options = field_index(field, collection_name)
+        indexes[collection_name][options['name']] = ([field], keys, options)
+
+    text_fields = {}
+    for field in searchable_fields(content_type__is_active=True):
+        content_type = field.content_type
+        collection_name = content_collection_name(content_type.name, content_type.storage_mode)
+        text_fields.setdefault(collection_name, []).append(field)
+
+    for collection_name, fields in text_fields.items():
+        keys, options = text_index(fields)
+        indexes[collection_name][TEXT_INDEX_NAME] = ([], keys, options)
+    return indexes
+
+
+def _set_status(fields, index_status):
+    # update() keeps the schema signal handlers out of status bookkeeping
+    if fields:
+        ContentTypeField.objects.filter(
+            pk__in=[field.pk for field in fields]).update(index_status=index_status)
+
+
+def _is_current(index, keys, options):
+    """Compare an existing index with its desired keys and options"""
+    if 'weights' in options:
+        # Text index keys are stored as _fts/_ftsx, compare what they are built from
+        return (
+            index.get('weights') == options['weights']
+            and index.get('default_language') == options['default_language']
+            and index.get('language_override', 'language') == options['language_override']
+        )
+    return list(index['key'].items()) == keys
+
+
+def reconcile_collection_indexes(collection, desired, log=logger.info):
+    """Reconcile the managed indexes of one collection; returns (created, dropped)"""
+    existing = {
+        index['name']: index for index in collection.list_indexes()
+        if index['name'].startswith(INDEX_PREFIX)
+    }
+
+    dropped = []
+    for name, index in existing.items():
+        wanted = desired.get(name)
+        if wanted is None or not _is_current(index, wanted[1], wanted[2]):
+            log(f"Dropping index {collection.name}.{name}")
+            collection.drop_index(name)
+            dropped.append(name)
+
+    created = []
+    for name, (fields, keys, options) in desired.items():
+        if name in existing and name not in dropped:
+            _set_status(
+                [field for field in fields if field.index_status != 'ready'], 'ready')
+            continue
+
+        log(f"Building index {collection.name}.{name}")
+        _set_status(fields, 'building')
+        try:
+            collection.create_index(keys, **options)
+        except Exception:
+            _set_status(fields, 'failed')
+            logger.exception('Building index %s.%s failed', collection.name, name)
+            continue
+        _set_status(fields, 'ready')
+        created.append(name)
+
+    return created, dropped
+
+
+def reconcile_indexes(log=logger.info):
+    """Build missing field indexes and drop stale ones; returns (created, dropped)"""
+    _scheduled.clear()
+
+    created = []
+    dropped = []
+    for collection_name, desired in desired_indexes().items():
+        collection_created, collection_dropped = reconcile_collection_indexes(
+            get_content_collection(collection_name), desired, log)
+        created += collection_created
+        dropped += collection_dropped
+
+    return created, dropped
+
+
+def _enqueue_reconcile():
+    if _scheduled.is_set():
+        return
+    _scheduled.set()
+    run_in_background(reconcile_indexes)
+
+
+def schedule_index_reconcile():
+    """Queue one background reconcile after commit, collapsing repeated requests"""
+    transaction.on_commit(_enqueue_reconcile)
@@ -0,0 +1,272 @@
+"""
+Load test of the content API: concurrent requests against list, detail,
+create, validate-only (?dry_run=true), the overview and the content types
+list, plus micro-benchmarks of validation and document conversion
+
+Requests go through the full Django stack in this process, one test client
+per worker thread, against a throwaway content type seeded with --entries
+entries and removed afterwards. It runs against the configured MongoDB, or
+with --in-memory against mongomock (pip install mongomock), which measures
+the application without the database. Save the results with --output and
+pass them to --compare on a later run to see the change per scenario.
+"""
+import datetime
+import json
+import platform
+import random
+import statistics
+import threading
+import time
+import timeit
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from mongoengine import DEFAULT_CONNECTION_NAME, disconnect, register_connection
+from content_types_app.models import ContentType, ContentTypeField
+from dynamic_content_app.management.commands.bench_serialization import (
+    hydrate_to_dict,
+    make_documents,
+    raw_to_dict
+)
+from dynamic_content_app.mongodb import (
+    get_content_collection,
+    insert_content_documents,
+    new_content_document
+)
+from dynamic_content_app.stats import content_created, get_stats_collection
+from dynamic_content_app.validators import get_content_schema, validate_dynamic_content
+
+
+SCENARIOS = ('content_types', 'overview', 'list', 'detail', 'validate', 'create')
+
+# Fields of the benchmark content type, one of each commonly used type
+FIELDS = (
+    ('title', 'text', True, None),
+    ('body', 'textarea', False, None),
+    ('price', 'number', False, None),
+    ('status', 'select', False, [{'value': 'draft'}, {'value': 'published'}]),
+    ('is_featured', 'boolean', False, None),
+    ('published_date', 'date', False, None),
+)
+
+
+def make_entry(i):
+    """Submitted data of one benchmark entry"""
+    return {
+        'title': f"Entry {i}",
+        'body': 'Lorem ipsum dolor sit amet. ' * 20,
+        'price': i % 1000 + 0.5,
+        'status': 'published' if i % 2 else 'draft',
+        'is_featured': bool(i % 3),
+        'published_date': '2024-01-01',
+    }
+
+
+def summarize(latencies, errors, elapsed):
+    """Latency percentiles in milliseconds and throughput of one scenario"""
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'requests_per_second': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(cuts[49] * 1000, 3),
+        'p95_ms': round(cuts[94] * 1000, 3),
+        'p99_ms': round(cuts[98] * 1000, 3),
+        'max_ms': round(max(latencies) * 1000, 3),
+    }
+
+
+def use_in_memory_mongodb():
+    """Point MongoEngine's default connection at a mongomock client"""
+    try:
+        import mongomock
+    except ImportError:
+        raise CommandError('--in-memory needs mongomock: pip install mongomock')
+    disconnect(DEFAULT_CONNECTION_NAME)
+    register_connection(
+        DEFAULT_CONNECTION_NAME,
+        host='mongodb://localhost/dynamic_form_bench',
+        mongo_client_class=mongomock.MongoClient
+    )
+
+
+class Command(BaseCommand):
+    help = 'Load test the content API and report latency percentiles and requests/s'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--entries', type=int, default=1000, help='Entries seeded before the run')
+        parser.add_argument('--requests', type=int, default=500, help='Timed requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=8, help='Worker threads sending requests')
+        parser.add_argument('--warmup', type=int, default=20, help='Untimed requests per scenario')
+        parser.add_argument(
+            '--scenarios', default=','.join(SCENARIOS),
+            help=f"Comma separated subset of: {', '.join(SCENARIOS)}")
+        parser.add_argument(
+            '--in-memory', action='store_true',
+            help='Use an in-memory mongomock database instead of the configured MongoDB')
+        parser.add_argument(
+            '--no-response-cache', action='store_true',
+            help='Disable the response cache so reads always query MongoDB')
+        parser.add_argument(
+            '--micro-documents', type=int, default=1000,
+            help='Documents per micro-benchmark run, 0 to skip them')
+        parser.add_argument('--output', help='Write the results as JSON to this file')
+        parser.add_argument('--compare', help='JSON results of an earlier run to compare with')
+
+    def handle(self, *args, **options):
+        scenarios = [name.strip() for name in options['scenarios'].split(',') if name.strip()]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+        for option in ('entries', 'requests', 'concurrency'):
+            if options[option] < 1:
+                raise CommandError(f"--{option} must be positive")
+        if options['requests'] < 2:
+            raise CommandError('--requests must be at least 2 to compute percentiles')
+
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        if options['in_memory']:
+            use_in_memory_mongodb()
+        if options['no_response_cache']:
+            settings.CONTENT_RESPONSE_CACHE = False
+
+        self.name = f"bench_{uuid.uuid4().hex[:8]}"
+        results = {
+            'started_at': datetime.datetime.utcnow().isoformat(),
+            'database': 'in-memory' if options['in_memory'] else 'mongodb',
+            'entries': options['entries'],
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'response_cache': settings.CONTENT_RESPONSE_CACHE,
+            'python': platform.python_version(),
+            'scenarios': {},
+            'micro': {},
+        }
+
+        content_type = self._create_content_type()
+        try:
+            self.ids = self._seed(options['entries'])
+            self.stdout.write(
+                f"Seeded {len(self.ids)} entries of '{self.name}', "
+                f"{options['concurrency']} workers, {options['requests']} requests per scenario")
+            for scenario in scenarios:
+                results['scenarios'][scenario] = self._run_scenario(scenario, options)
+                self._report(scenario, results['scenarios'][scenario], baseline)
+            if options['micro_documents']:
+                results['micro'] = self._micro(options['micro_documents'])
+        finally:
+            self._cleanup(content_type)
+
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(results, f, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['output']}"))
+
+    def _create_content_type(self):
+        content_type = ContentType.objects.create(
+            name=self.name, display_name='Benchmark', description='Created by bench_api')
+        for order, (field_name, field_type, is_required, choices) in enumerate(FIELDS):
+            ContentTypeField.objects.create(
+                content_type=content_type,
+                field_name=field_name,
+                display_name=field_name.replace('_', ' ').title(),
+                field_type=field_type,
+                is_required=is_required,
+                choices=choices,
+                order=order
+            )
+        return content_type
+
+    def _seed(self, count):
+        schema = get_content_schema(self.name)
+        documents = [
+            new_content_document(self.name, schema.validate(make_entry(i))) for i in range(count)]
+        failed = insert_content_documents(
+            get_content_collection(schema.collection_name), documents, settings.CONTENT_BULK_CHUNK_SIZE)
+        if failed:
+            raise CommandError(f"{len(failed)} entries could not be seeded")
+        content_created(self.name, len(documents))
+        return [str(document['_id']) for document in documents]
+
+    def _cleanup(self, content_type):
+        collection_name = get_content_schema(self.name).collection_name
+        get_content_collection(collection_name).delete_many({'content_type': self.name})
+        get_stats_collection().delete_one({'_id': self.name})
+        content_type.delete()
+
+    def _request(self, scenario, client, i):
+        """Send request i of a scenario and return its status code"""
+        base = f'/api/content/{self.name}/'
+        if scenario == 'content_types':
+            return client.get('/api/content-types/').status_code
+        if scenario == 'overview':
+            return client.get('/api/content/').status_code
+        if scenario == 'list':
+            return client.get(base, {'page_size': 20}).status_code
+        if scenario == 'detail':
+            return client.get(f'{base}{random.choice(self.ids)}/').status_code
+        data = json.dumps(make_entry(i))
+        if scenario == 'validate':
+            return client.post(
+                f'{base}?dry_run=true', data, content_type='application/json').status_code
+        return client.post(base, data, content_type='application/json').status_code
+
+    def _run_scenario(self, scenario, options):
+        local = threading.local()
+        host = next((host for host in settings.ALLOWED_HOSTS if '*' not in host), 'localhost')
+
+        def send(i):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client(raise_request_exception=False, HTTP_HOST=host)
+            started = time.perf_counter()
+            status_code = self._request(scenario, client, i)
+            return time.perf_counter() - started, status_code
+
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            list(executor.map(send, range(options['warmup'])))
+            started = time.perf_counter()
+            outcomes = list(executor.map(send, range(options['requests'])))
+            elapsed = time.perf_counter() - started
+
+        latencies = [latency for latency, _ in outcomes]
+        errors = sum(1 for _, status_code in outcomes if status_code >= 400)
+        return summarize(latencies, errors, elapsed)
+
+    def _report(self, scenario, result, baseline):
+        line = (
+            f"{scenario:>13}: {result['requests_per_second']:9.1f} req/s  "
+            f"p50 {result['p50_ms']:8.2f} ms  p95 {result['p95_ms']:8.2f} ms  "
+            f"p99 {result['p99_ms']:8.2f} ms")
+        if result['errors']:
+            line += f"  {result['errors']} errors"
+        previous = (baseline or {}).get('scenarios', {}).get(scenario)
+        if previous:
+            change = result['requests_per_second'] / previous['requests_per_second'] - 1
+            line += f"  ({change:+.1%} req/s vs baseline)"
+        self.stdout.write(line)
+
+    def _micro(self, count):
+        """Best of 5 runs of validation and document conversion, in us per document"""
+        entries = [make_entry(i) for i in range(count)]
+        documents = make_documents(count)
+        functions = {
+            'validate_dynamic_content': lambda: [
+                validate_dynamic_content(self.name, entry) for entry in entries],
+            'DynamicContent.to_dict': lambda: hydrate_to_dict(documents),
+            'document_to_dict': lambda: raw_to_dict(documents),
+        }
+
+        results = {}
+        for name, function in functions.items():
+            best = min(timeit.repeat(function, number=1, repeat=5))
+            results[name] = {'us_per_document': round(best / count * 1e6, 3)}
+            self.stdout.write(f"{name:>25}: {results[name]['us_per_document']:8.2f} us/doc")
+        return results
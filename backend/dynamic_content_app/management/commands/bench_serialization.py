@@ -0,0 +1,78 @@
+"""
+Micro-benchmark of the read path: MongoEngine hydration + to_dict() versus
+document_to_dict() on the raw pymongo documents
+
+Runs entirely in memory on synthetic documents, no database needed, and
+checks that both paths render to byte-identical JSON before timing them.
+"""
+import datetime
+import json
+import timeit
+
+from bson import ObjectId, Decimal128
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.utils.encoders import JSONEncoder
+from dynamic_content_app.mongodb import DynamicContent, document_to_dict
+
+
+def make_documents(count):
+    """Build raw documents shaped like what the write paths store"""
+    now = datetime.datetime(2024, 1, 1, 12, 0, 0, 123000)
+    return [
+        {
+            '_id': ObjectId(),
+            'title': f"Entry {i}",
+            'body': 'Lorem ipsum dolor sit amet. ' * 20,
+            'price': float(i),
+            'status': 'published' if i % 2 else 'draft',
+            'is_featured': bool(i % 3),
+            'email': f"user{i}@example.com",
+            'published_date': '2024-01-01',
+            'owner': ObjectId(),
+            'amount': Decimal128(f"{i}.50"),
+            'content_type': 'benchmark',
+            'created_at': now,
+            'updated_at': now,
+            'version': 1,
+        }
+        for i in range(count)
+    ]
+
+
+def hydrate_to_dict(documents):
+    return [DynamicContent._from_son(document).to_dict() for document in documents]
+
+
+def raw_to_dict(documents):
+    return [document_to_dict(document) for document in documents]
+
+
+class Command(BaseCommand):
+    help = 'Compare DynamicContent hydration + to_dict() with the raw document converter'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--documents', type=int, default=1000, help='Documents per run')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs, the best one is reported')
+
+    def handle(self, *args, **options):
+        documents = make_documents(options['documents'])
+
+        encoder = JSONEncoder()
+        if encoder.encode(hydrate_to_dict(documents)) != encoder.encode(raw_to_dict(documents)):
+            raise CommandError('document_to_dict output differs from DynamicContent.to_dict')
+
+        results = {}
+        for name, function in (('hydrate + to_dict', hydrate_to_dict), ('document_to_dict', raw_to_dict)):
+            best = min(timeit.repeat(lambda: function(documents), number=1, repeat=options['repeat']))
+            results[name] = best
+            self.stdout.write(
+                f"{name:>18}: {best * 1000:8.2f} ms / {len(documents)} docs "
+                f"({best / len(documents) * 1e6:.2f} us/doc)")
+
+        speedup = results['hydrate + to_dict'] / results['document_to_dict']
+        self.stdout.write(self.style.SUCCESS(f"Output identical, {speedup:.1f}x faster"))
+        self.stdout.write(json.dumps({
+            'documents': len(documents),
+            'seconds': results,
+            'speedup': round(speedup, 2),
+        }))
@@ -0,0 +1,27 @@
+"""
+Health check of the MongoDB connection for deploy scripts and probes
+"""
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from dynamic_content_app.mongodb import check_mongodb_health
+
+
+class Command(BaseCommand):
+    help = 'Ping MongoDB and print the connection pool counters; exits non-zero when unreachable'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--json', action='store_true', help='Print the result as JSON')
+
+    def handle(self, *args, **options):
+        health = check_mongodb_health()
+
+        if options['json']:
+            self.stdout.write(json.dumps(health))
+        elif health['status'] == 'ok':
+            self.stdout.write(self.style.SUCCESS(f"MongoDB reachable in {health['ping_ms']} ms"))
+            for name, value in health['pool'].items():
+                self.stdout.write(f"{name:>20}: {value}")
+
+        if health['status'] != 'ok':
+            raise CommandError(f"MongoDB unreachable: {health['error']}")
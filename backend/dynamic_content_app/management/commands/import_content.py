@@ -0,0 +1,207 @@
+"""
+Bulk import content entries from an NDJSON or CSV file
+
+Records are parsed on the main thread and handed in batches to a pool of
+workers that validate them against the content type schema and write them
+with insert_many, so parsing, validation and I/O overlap. Records the schema
+or the server reject are written to a rejects file, and an interrupted
+import can be resumed with --offset.
+"""
+import csv
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+from dynamic_content_app.mongodb import (
+    get_content_collection,
+    new_content_document,
+    insert_content_documents
+)
+from dynamic_content_app.stats import content_created
+from dynamic_content_app.validators import get_content_schema
+
+
+def read_records(path, file_format, offset):
+    """Yield (position, record, error) for every record at or after offset"""
+    with open(path, newline='', encoding='utf-8') as f:
+        if file_format == 'csv':
+            for position, row in enumerate(csv.DictReader(f)):
+                if position >= offset:
+                    yield position, row, None
+            return
+
+        position = 0
+        for line in f:
+            if not line.strip():
+                continue
+            if position >= offset:
+                try:
+                    record = json.loads(line)
+                except ValueError as e:
+                    yield position, line.rstrip('\n'), f"Invalid JSON: {e}"
+                else:
+                    yield position, record, None
+            position += 1
+
+
+def batched(records, batch_size):
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def process_batch(schema, batch):
+    """Validate and insert one batch, returning (inserted count, rejects)"""
+    rejects = []
+    positions = []
+    documents = []
+
+    for position, record, error in batch:
+        if error is None and not isinstance(record, dict):
+            error = 'Expected an object'
+        if error is not None:
+            rejects.append({'offset': position, 'record': record, 'errors': error})
+            continue
+        try:
+            validated_data = schema.validate(record)
+        except ValidationError as e:
+            rejects.append({'offset': position, 'record': record, 'errors': e.detail})
+            continue
+        positions.append((position, record))
+        documents.append(new_content_document(schema.name, validated_data))
+
+    failed = insert_content_documents(
+        get_content_collection(schema.collection_name), documents, len(documents) or 1)
+    for index, message in failed.items():
+        position, record = positions[index]
+        rejects.append({'offset': position, 'record': record, 'errors': message})
+
+    inserted = len(documents) - len(failed)
+    content_created(schema.name, inserted)
+    return inserted, rejects
+
+
+class Command(BaseCommand):
+    help = 'Import content entries for a content type from an NDJSON or CSV file'
+
+    def add_arguments(self, parser):
+        parser.add_argument('content_type', help='Name of the content type to import into')
+        parser.add_argument('file', help='Path of the NDJSON or CSV file')
+        parser.add_argument(
+            '--format', choices=['ndjson', 'csv'],
+            help='File format, inferred from the file extension by default')
+        parser.add_argument(
+            '--batch-size', type=int, default=settings.CONTENT_BULK_CHUNK_SIZE,
+            help='Records per insert_many call')
+        parser.add_argument(
+            '--workers', type=int, default=4,
+            help='Number of validation/write workers')
+        parser.add_argument(
+            '--offset', type=int, default=0,
+            help='Skip this many records, to resume an interrupted import')
+        parser.add_argument(
+            '--rejects',
+            help='NDJSON file receiving rejected records (default: <file>.rejects.ndjson)')
+        parser.add_argument(
+            '--progress-every', type=int, default=10,
+            help='Report progress every N batches')
+
+    def handle(self, *args, **options):
+        path = options['file']
+        file_format = options['format'] or ('csv' if path.lower().endswith('.csv') else 'ndjson')
+        batch_size = options['batch_size']
+        workers = options['workers']
+        if batch_size < 1 or workers < 1:
+            raise CommandError('--batch-size and --workers must be positive')
+
+        try:
+            schema = get_content_schema(options['content_type'])
+        except ValidationError as e:
+            raise CommandError(e.detail[0])
+
+        rejects_path = options['rejects'] or f"{path}.rejects.ndjson"
+        self.offset = options['offset']
+        self.inserted = 0
+        self.rejected = 0
+        self.progress_every = options['progress_every']
+        self.collected = 0
+        self.started = time.monotonic()
+
+        batches = batched(read_records(path, file_format, self.offset), batch_size)
+        pending = deque()
+        self.failure = None
+        interrupted = False
+
+        with open(rejects_path, 'a', encoding='utf-8') as rejects_file, \
+                ThreadPoolExecutor(max_workers=workers) as executor:
+            try:
+                for batch in batches:
+                    # Keep a bounded number of batches in flight
+                    if len(pending) >= workers * 2:
+                        self._collect(pending, rejects_file)
+                    if self.failure is not None:
+                        break
+                    pending.append((batch, executor.submit(process_batch, schema, batch)))
+            except KeyboardInterrupt:
+                interrupted = True
+
+            if interrupted or self.failure is not None:
+                # Workers take batches in order, so the cancelled ones are
+                # the tail and the started ones before them are finished
+                # here: the resume offset then covers everything written
+                for _, future in pending:
+                    future.cancel()
+            while pending and not pending[0][1].cancelled():
+                self._collect(pending, rejects_file)
+
+        self._report()
+        if interrupted:
+            raise CommandError(f"Interrupted, resume with --offset {self.offset}")
+        if self.failure is not None:
+            raise CommandError(
+                f"Stopped after an error: {self.failure}. The records of the failed batch "
+                f"are in {rejects_path}, resume with --offset {self.offset}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {self.inserted} entries into '{schema.name}', "
+            f"{self.rejected} rejected (see {rejects_path})"))
+
+    def _collect(self, pending, rejects_file):
+        """Wait for the oldest batch and advance the resume offset past it"""
+        batch, future = pending[0]
+        try:
+            inserted, rejects = future.result()
+        except Exception as e:
+            # How much of the batch got written is unknown, so all of it
+            # goes to the rejects file and the import stops
+            self.failure = self.failure or e
+            inserted = 0
+            rejects = [
+                {'offset': position, 'record': record, 'errors': f"Batch failed: {e}"}
+                for position, record, _ in batch
+            ]
+        # Only dropped once done, so an interrupt while waiting leaves it to drain
+        pending.popleft()
+        for reject in rejects:
+            rejects_file.write(json.dumps(reject, default=str) + '\n')
+        self.inserted += inserted
+        self.rejected += len(rejects)
+        self.offset = batch[-1][0] + 1
+        self.collected += 1
+        if self.collected % self.progress_every == 0:
+            self._report()
+
+    def _report(self):
+        elapsed = time.monotonic() - self.started
+        rate = (self.inserted + self.rejected) / elapsed if elapsed else 0
+        self.stdout.write(
+            f"{self.inserted} inserted, {self.rejected} rejected, "
+            f"{rate:.0f} records/s, resume offset {self.offset}")
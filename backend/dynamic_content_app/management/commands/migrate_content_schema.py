@@ -0,0 +1,73 @@
+"""
+Run the rewrites of stored entries recorded after fields were renamed,
+retyped or removed, or show their progress
+"""
+import datetime
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from dynamic_content_app.evolution import (
+    describe_operations,
+    get_migrations_collection,
+    run_schema_migrations,
+    unfinished_jobs
+)
+
+
+class Command(BaseCommand):
+    help = 'Run pending schema rewrites of stored entries; rerun to resume an interrupted one'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Entries per batch')
+        parser.add_argument(
+            '--pause', type=float, default=None,
+            help='Seconds to sleep between batches to limit the load on MongoDB')
+        parser.add_argument(
+            '--wait', action='store_true',
+            help='Wait for the jobs that are not due yet instead of leaving them pending')
+        parser.add_argument(
+            '--status', nargs='?', const='', metavar='CONTENT_TYPE',
+            help='Only show the recorded rewrites, optionally of one content type')
+
+    def handle(self, *args, **options):
+        if options['status'] is not None:
+            query = {'content_type': options['status']} if options['status'] else {}
+            jobs = list(get_migrations_collection().find(query).sort('_id', 1))
+            if not jobs:
+                self.stdout.write('No schema rewrites recorded')
+            for job in jobs:
+                self.stdout.write(
+                    f"{job['content_type']}: {describe_operations(job['operations'])}\n"
+                    f"  status: {job['status']}, {job['processed']}/{job.get('total', '?')} "
+                    f"entries, {job['modified']} rewritten, {job['failed']} not convertible")
+                if job['status'] == 'pending':
+                    self.stdout.write(f"  due at: {job['start_at']}")
+                for failure in job['failures']:
+                    self.stdout.write(
+                        f"  {failure['id']}: {failure['field']} = {failure['value']!r}")
+            return
+
+        if options['batch_size'] is not None and options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        completed = 0
+        while True:
+            completed += run_schema_migrations(
+                batch_size=options['batch_size'],
+                pause=options['pause'],
+                log=self.stdout.write
+            )
+            waiting = [
+                job for job in unfinished_jobs() if job['status'] == 'pending']
+            if not waiting or not options['wait']:
+                break
+            # Due jobs still pending wait for an earlier job of their content type
+            start_at = min(job['start_at'] for job in waiting)
+            remaining = max((start_at - datetime.datetime.utcnow()).total_seconds(), 1)
+            self.stdout.write(f"Waiting {remaining:.0f}s for pending jobs")
+            time.sleep(remaining)
+
+        self.stdout.write(self.style.SUCCESS(f"Completed {completed} schema rewrite(s)"))
+        if waiting:
+            self.stdout.write(
+                f"{len(waiting)} job(s) not run yet, see --status; pass --wait to wait for them")
@@ -0,0 +1,64 @@
+"""
+Move a content type's entries between the shared dynamic_contents collection
+and a dedicated content_<name> collection while it stays online
+"""
+from django.core.management.base import BaseCommand, CommandError
+from content_types_app.models import ContentType
+from dynamic_content_app.storage import (
+    STORAGE_MODES,
+    StorageMigration,
+    StorageMigrationError,
+    get_migration
+)
+
+
+class Command(BaseCommand):
+    help = 'Move a content type to shared or dedicated storage; rerun to resume an interrupted move'
+
+    def add_arguments(self, parser):
+        parser.add_argument('content_type', help='Name of the content type')
+        parser.add_argument(
+            '--to', choices=STORAGE_MODES, default='dedicated',
+            help='Target storage mode (default: dedicated)')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Entries per batch')
+        parser.add_argument(
+            '--pause', type=float, default=0.0,
+            help='Seconds to sleep between batches to limit the load on MongoDB')
+        parser.add_argument(
+            '--status', action='store_true', help='Only show the state of the last move')
+
+    def handle(self, *args, **options):
+        try:
+            content_type = ContentType.objects.get(name=options['content_type'])
+        except ContentType.DoesNotExist:
+            raise CommandError(f"Content type '{options['content_type']}' not found")
+
+        if options['status']:
+            state = get_migration(content_type.name)
+            self.stdout.write(f"storage_mode: {content_type.storage_mode}")
+            if state is not None:
+                for key in ('source', 'target', 'phase', 'copied', 'last_id',
+                            'started_at', 'switched_at', 'finished_at'):
+                    if state.get(key) is not None:
+                        self.stdout.write(f"{key}: {state[key]}")
+            return
+
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+
+        try:
+            migration = StorageMigration(
+                content_type,
+                options['to'],
+                batch_size=options['batch_size'],
+                pause=options['pause'],
+                log=self.stdout.write
+            )
+        except StorageMigrationError as e:
+            raise CommandError(str(e))
+
+        if not migration.run():
+            self.stdout.write(f"'{content_type.name}' already uses {options['to']} storage")
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Moved '{content_type.name}' to {options['to']} storage"))
@@ -0,0 +1,16 @@
+"""
+Rebuild the per content type counters from the stored documents
+"""
+from django.core.management.base import BaseCommand
+from dynamic_content_app.stats import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = 'Recount the entries of every content type with a $group aggregation'
+
+    def handle(self, *args, **options):
+        counts = rebuild_stats()
+        for name, count in sorted(counts.items()):
+            self.stdout.write(f"{name}: {count}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt counters for {len(counts)} content types"))
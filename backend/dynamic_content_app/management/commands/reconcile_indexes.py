@@ -0,0 +1,14 @@
+"""
+Build and drop the per-field MongoDB indexes declared on ContentTypeField
+"""
+from django.core.management.base import BaseCommand
+from dynamic_content_app.indexes import reconcile_indexes
+
+
+class Command(BaseCommand):
+    help = 'Reconcile per-field content indexes with the content type schema'
+
+    def handle(self, *args, **options):
+        created, dropped = reconcile_indexes(log=self.stdout.write)
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(created)} indexes built, {len(dropped)} dropped"))
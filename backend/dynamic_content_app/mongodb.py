@@ -1,27 +1,305 @@
 """
 MongoDB connection and document models using MongoEngine
+
+The connection is registered once per process when the app loads and the
+client is only created by MongoEngine on first use, so nothing connects at
+import time. After a fork the child drops the clients it inherited and gets
+fresh ones, which keeps pre-fork servers (gunicorn --preload) safe.
 """
-from mongoengine import connect, Document, DynamicDocument, StringField, DateTimeField, DictField
+import os
+import threading
+import time
+
+from mongoengine import (
+    register_connection,
+    get_connection,
+    DEFAULT_CONNECTION_NAME,
+    Document,
+    DynamicDocument,
+    StringField,
+    DateTimeField,
+    DictField,
+    IntField
+)
+from mongoengine import connection as mongoengine_connection
 from django.conf import settings
+from bson import ObjectId, Decimal128
+from pymongo import monitoring
+from pymongo.errors import BulkWriteError, PyMongoError
 import datetime
 
 
-# Connect to MongoDB
-def get_mongodb_connection():
-    """Initialize MongoDB connection"""
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Per-process connection pool counters, summed over all pools and clients"""
+
+    COUNTERS = (
+        'connections_created', 'connections_closed', 'checked_out',
+        'checked_in', 'checkout_failed', 'pools_cleared'
+    )
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = dict.fromkeys(self.COUNTERS, 0)
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        counters['open'] = counters['connections_created'] - counters['connections_closed']
+        counters['in_use'] = counters['checked_out'] - counters['checked_in']
+        counters['pid'] = os.getpid()
+        return counters
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._count('pools_cleared')
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self._count('connections_created')
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._count('connections_closed')
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._count('checkout_failed')
+
+    def connection_checked_out(self, event):
+        self._count('checked_out')
+
+    def connection_checked_in(self, event):
+        self._count('checked_in')
+
+
+pool_monitor = PoolMonitor()
+
+
+def mongodb_client_options():
+    """pymongo client options from MONGODB_CLIENT_OPTIONS, unset values left out"""
+    options = {
+        name: value for name, value in settings.MONGODB_CLIENT_OPTIONS.items()
+        if value not in (None, [])
+    }
+    options['event_listeners'] = [pool_monitor]
+    return options
+
+
+def mongodb_host_settings():
+    """Host (a connection URL or host/port/db) from MONGODB_SETTINGS"""
     mongodb_settings = settings.MONGODB_SETTINGS
     
     # Check if using connection URL (host contains full URI)
     if 'host' in mongodb_settings and mongodb_settings['host'].startswith('mongodb'):
         # Connection URL format (e.g., mongodb://... or mongodb+srv://...)
-        return connect(host=mongodb_settings['host'])
-    else:
-        # Individual parameters format
-        return connect(
-            db=mongodb_settings.get('db'),
-            host=mongodb_settings.get('host'),
-            port=mongodb_settings.get('port')
-        )
+        return {'host': mongodb_settings['host']}
+    # Individual parameters format
+    return {
+        'db': mongodb_settings.get('db'),
+        'host': mongodb_settings.get('host'),
+        'port': mongodb_settings.get('port')
+    }
+
+
+_registered = False
+_register_lock = threading.Lock()
+
+
+def register_mongodb_connection():
+    """Register the connection settings with MongoEngine (idempotent, no I/O)"""
+    global _registered
+    with _register_lock:
+        if not _registered:
+            register_connection(
+                DEFAULT_CONNECTION_NAME,
+                **mongodb_host_settings(),
+                **mongodb_client_options()
+            )
+            _registered = True
+
+
+def get_mongodb_connection():
+    """Return this process's MongoDB client, creating it on first use"""
+    register_mongodb_connection()
+    return get_connection()
+
+
+def check_mongodb_health():
+    """Ping the server and report the round-trip time and the pool counters"""
+    started = time.perf_counter()
+    try:
+        get_mongodb_connection().admin.command('ping')
+    except PyMongoError as e:
+        return {'status': 'error', 'error': str(e), 'pool': pool_monitor.stats()}
+    return {
+        'status': 'ok',
+        'ping_ms': round((time.perf_counter() - started) * 1000, 2),
+        'pool': pool_monitor.stats()
+    }
+
+
+def _forget_inherited_connections():
+    """
+    Drop the clients inherited from the parent in a forked child. They are
+    not closed: that would end the parent's server sessions. MongoEngine
+    builds new clients from the registered settings on next use.
+    """
+    mongoengine_connection._connections.clear()
+    mongoengine_connection._dbs.clear()
+    for document in (DynamicContent, ContentTypeStats):
+        document._collection = None
+    _prepared_collections.clear()
+    pool_monitor.reset()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_forget_inherited_connections)
+
+
+SHARED_COLLECTION = 'dynamic_contents'
+DEDICATED_PREFIX = 'content_'
+
+# Indexes every dedicated collection gets, mirroring DynamicContent.meta
+DEDICATED_INDEXES = (
+    [('created_at', 1)],
+    [('content_type', 1), ('created_at', -1), ('_id', -1)],
+)
+
+_prepared_collections = set()
+
+
+def content_collection_name(content_type_name, storage_mode):
+    """Name of the collection holding a content type's entries"""
+    if storage_mode == 'dedicated':
+        return f"{DEDICATED_PREFIX}{content_type_name}"
+    return SHARED_COLLECTION
+
+
+def prepare_dedicated_collection(collection):
+    """Create the base indexes of a dedicated collection (idempotent)"""
+    for keys in DEDICATED_INDEXES:
+        collection.create_index(keys)
+
+
+def get_content_collection(collection_name=None):
+    """
+    Return the raw pymongo collection named by a schema's collection_name,
+    the shared DynamicContent collection by default. Entries keep their
+    content_type in dedicated collections too, so queries are the same.
+    """
+    shared = DynamicContent._get_collection()
+    if collection_name is None or collection_name == SHARED_COLLECTION:
+        return shared
+
+    collection = shared.database[collection_name]
+    if collection_name not in _prepared_collections:
+        prepare_dedicated_collection(collection)
+        _prepared_collections.add(collection_name)
+    return collection
+
+
+TIMESTAMP_FIELDS = ('created_at', 'updated_at')
+
+# Keys of the declared DynamicContent fields, emitted first by to_dict
+DECLARED_KEYS = frozenset(('_id', 'content_type') + TIMESTAMP_FIELDS + ('version',))
+
+
+def _isoformat(value):
+    return value.isoformat() if value else None
+
+
+def convert_value(value):
+    """Make a top-level BSON value JSON-ready (ObjectId, Decimal128)"""
+    value_type = type(value)
+    if value_type is ObjectId:
+        return str(value)
+    if value_type is Decimal128:
+        return value.to_decimal()
+    return value
+
+
+def document_to_dict(document, fields=None):
+    """
+    Convert a raw pymongo document to exactly what DynamicContent.to_dict
+    returns for the same document, without hydrating a DynamicContent.
+    Declared fields come first, then dynamic fields in stored order.
+    """
+    if fields is not None:
+        result = {}
+        for field_name in fields:
+            if field_name == 'id':
+                result['id'] = str(document['_id'])
+            elif field_name in TIMESTAMP_FIELDS:
+                result[field_name] = _isoformat(document.get(field_name))
+            elif field_name == 'version':
+                result['version'] = document.get('version', 0)
+            elif field_name in document:
+                result[field_name] = convert_value(document[field_name])
+        return result
+
+    get = document.get
+    result = {
+        'id': str(document['_id']),
+        'content_type': get('content_type'),
+        'created_at': _isoformat(get('created_at')),
+        'updated_at': _isoformat(get('updated_at')),
+        # Entries written before versioning count as version 0
+        'version': get('version', 0),
+    }
+    for key, value in document.items():
+        if key not in DECLARED_KEYS:
+            result[key] = convert_value(value)
+    return result
+
+
+def new_content_document(content_type_name, validated_data):
+    """Build a raw document for insertion, mirroring DynamicContent defaults"""
+    now = datetime.datetime.utcnow()
+    document = dict(validated_data)
+    document.update(content_type=content_type_name, created_at=now, updated_at=now, version=1)
+    return document
+
+
+def drop_content_collection(collection_name):
+    """Drop a dedicated content collection"""
+    get_content_collection(collection_name).drop()
+    _prepared_collections.discard(collection_name)
+
+
+def insert_content_documents(collection, documents, chunk_size):
+    """
+    Insert raw documents with unordered insert_many calls of chunk_size
+
+    Returns {position: error message} for the documents the server rejected;
+    every other document was inserted and has its _id set.
+    """
+    failed = {}
+    for start in range(0, len(documents), chunk_size):
+        try:
+            collection.insert_many(documents[start:start + chunk_size], ordered=False)
+        except BulkWriteError as e:
+            for write_error in e.details.get('writeErrors', []):
+                failed[start + write_error['index']] = write_error.get('errmsg', 'Write failed')
+    return failed
 
 
 class DynamicContent(DynamicDocument):
@@ -32,34 +310,55 @@ class DynamicContent(DynamicDocument):
     content_type = StringField(required=True, max_length=100)
     created_at = DateTimeField(default=datetime.datetime.utcnow)
     updated_at = DateTimeField(default=datetime.datetime.utcnow)
+    # Incremented by every write, for optimistic concurrency (If-Match)
+    version = IntField(default=0)
     
     meta = {
-        'collection': 'dynamic_contents',
+        'collection': SHARED_COLLECTION,
         'indexes': [
             'content_type',
             'created_at',
+            # Keyset pagination: newest first within a content type
+            ('content_type', '-created_at', '-id'),
         ]
     }
     
     def save(self, *args, **kwargs):
-        """Update the updated_at timestamp on save"""
+        """Update the updated_at timestamp and the version on save"""
         self.updated_at = datetime.datetime.utcnow()
+        self.version = (self.version or 0) + 1
         return super(DynamicContent, self).save(*args, **kwargs)
     
-    def to_dict(self):
-        """Convert document to dictionary"""
-        from bson import ObjectId
+    def to_dict(self, fields=None):
+        """Convert document to dictionary, optionally limited to the given fields"""
         result = {}
-        for field_name in self:
+        for field_name in self if fields is None else fields:
             if field_name == '_id':
                 result['id'] = str(self[field_name])
-            elif field_name in ['created_at', 'updated_at']:
-                result[field_name] = self[field_name].isoformat() if self[field_name] else None
+            elif field_name in TIMESTAMP_FIELDS:
+                result[field_name] = _isoformat(self[field_name])
             else:
-                value = self[field_name]
+                try:
+                    value = self[field_name]
+                except KeyError:
+                    # Dynamic field not set on this document
+                    continue
                 # Convert ObjectId to string
-                if isinstance(value, ObjectId):
-                    result[field_name] = str(value)
-                else:
-                    result[field_name] = value
+                result[field_name] = convert_value(value)
         return result
+
+
+class ContentTypeStats(Document):
+    """
+    Per content type counters, maintained with $inc by every write path
+    so the overview never has to count documents. `version` is bumped on
+    every create, update and delete and drives the list ETags.
+    """
+    content_type = StringField(primary_key=True, max_length=100)
+    count = IntField(default=0)
+    version = IntField(default=0)
+    modified_at = DateTimeField()
+    
+    meta = {
+        'collection': 'content_type_stats',
+    }
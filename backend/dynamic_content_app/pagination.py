@@ -0,0 +1,151 @@
+"""
+Keyset (cursor) pagination for dynamic content lists
+
+Pages are ordered on the requested sort keys (newest first on created_at by
+default) with _id as the tie-breaker, and the cursor encodes the sort key
+values of the last document of the previous page. Fetching page N is then a
+single index range scan no matter how deep N is.
+"""
+import base64
+import datetime
+import json
+
+from bson import ObjectId
+from bson.errors import InvalidId
+from django.conf import settings
+from rest_framework.exceptions import ValidationError
+
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# (field name, direction) pairs, _id is appended as the tie-breaker
+DEFAULT_SORT = (('created_at', -1),)
+
+
+def sort_token(sort):
+    """Render a sort spec the way it is written in ?sort="""
+    return ','.join(('-' if direction < 0 else '') + field for field, direction in sort)
+
+
+def _encode_value(value):
+    if isinstance(value, datetime.datetime):
+        return {'$date': int((value - EPOCH).total_seconds() * 1000)}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        return EPOCH + datetime.timedelta(milliseconds=int(value['$date']))
+    return value
+
+
+def encode_cursor(sort, values, object_id):
+    """Encode the sort key values and _id of a document as an opaque url-safe token"""
+    payload = json.dumps(
+        [sort_token(sort), [_encode_value(value) for value in values], str(object_id)],
+        separators=(',', ':')
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, sort):
+    """Decode a token produced by encode_cursor back to (values, ObjectId)"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        token, values, object_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        if token != sort_token(sort) or len(values) != len(sort):
+            raise ValueError('Cursor does not match the requested sort')
+        return [_decode_value(value) for value in values], ObjectId(object_id)
+    except (ValueError, TypeError, KeyError, InvalidId):
+        raise ValidationError({'cursor': 'Invalid cursor'})
+
+
+def get_page_size(request):
+    """
+    Read ?page_size= from the request, capped at CONTENT_MAX_PAGE_SIZE.
+    Takes DRF and plain Django requests alike.
+    """
+    page_size = request.GET.get('page_size')
+    if page_size is None:
+        return settings.CONTENT_PAGE_SIZE
+
+    try:
+        page_size = int(page_size)
+    except ValueError:
+        raise ValidationError({'page_size': 'Must be an integer'})
+
+    if page_size < 1:
+        raise ValidationError({'page_size': 'Must be a positive integer'})
+
+    return min(page_size, settings.CONTENT_MAX_PAGE_SIZE)
+
+
+def cursor_filter(cursor, sort):
+    """Build the raw Mongo filter selecting documents after the cursor position"""
+    values, object_id = decode_cursor(cursor, sort)
+    keys = list(sort) + [('_id', sort[-1][1])]
+    values = values + [object_id]
+
+    clauses = []
+    for position, (field, direction) in enumerate(keys):
+        clause = {key: value for (key, _), value in zip(keys[:position], values[:position])}
+        value = values[position]
+        # null (or a missing field) sorts before every other value, and
+        # range operators never match it, so it is handled explicitly
+        if value is None:
+            if direction < 0:
+                continue
+            clause[field] = {'$ne': None}
+        elif direction < 0:
+            clause[field] = {'$lt': value}
+            clauses.append(dict(clause, **{field: None}))
+        else:
+            clause[field] = {'$gt': value}
+        clauses.append(clause)
+
+    return {'$or': clauses}
+
+
+def _page_request(query, request, sort):
+    """Return (page query, sort keys, page size) for the page requested by ?cursor="""
+    page_size = get_page_size(request)
+    cursor = request.GET.get('cursor')
+
+    if cursor:
+        query = {'$and': [query, cursor_filter(cursor, sort)]}
+
+    keys = list(sort) + [('_id', sort[-1][1])]
+    return query, keys, page_size
+
+
+def _page_result(documents, sort, page_size):
+    next_cursor = None
+    if len(documents) > page_size:
+        documents = documents[:page_size]
+        last = documents[-1]
+        next_cursor = encode_cursor(
+            sort, [last.get(field) for field, _ in sort], last['_id'])
+
+    return documents, next_cursor
+
+
+def paginate(collection, query, request, sort=DEFAULT_SORT, projection=None):
+    """
+    Return (raw documents, next_cursor) for the page requested by ?cursor=
+
+    One extra document is fetched to know whether another page exists
+    without running a count.
+    """
+    query, keys, page_size = _page_request(query, request, sort)
+    documents = list(
+        collection.find(query, projection).sort(keys).limit(page_size + 1)
+    )
+    return _page_result(documents, sort, page_size)
+
+
+async def apaginate(collection, query, request, sort=DEFAULT_SORT, projection=None):
+    """paginate() on a Motor collection"""
+    query, keys, page_size = _page_request(query, request, sort)
+    documents = await collection.find(query, projection).sort(keys).limit(
+        page_size + 1).to_list(page_size + 1)
+    return _page_result(documents, sort, page_size)
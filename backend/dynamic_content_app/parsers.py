@@ -0,0 +1,42 @@
+"""
+Binary request parsers matching the renderers in renderers.py
+"""
+import bson
+from bson.errors import BSONError
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser
+from rest_framework.settings import api_settings
+from .renderers import msgpack
+
+
+class MessagePackParser(BaseParser):
+    media_type = 'application/msgpack'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return msgpack.unpackb(stream.read(), raw=False)
+        except (ValueError, msgpack.UnpackException) as exc:
+            raise ParseError(f"MessagePack parse error - {exc}")
+
+
+class BSONParser(BaseParser):
+    """
+    Parse one BSON document. Bulk creates, which take an array, send it as
+    {"items": [...]} since BSON has no top level arrays.
+    """
+    media_type = 'application/bson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        try:
+            return bson.decode(stream.read())
+        except (BSONError, ValueError) as exc:
+            raise ParseError(f"BSON parse error - {exc}")
+
+
+def content_parser_classes():
+    """JSON from the settings, plus the binary formats"""
+    parsers = list(api_settings.DEFAULT_PARSER_CLASSES)
+    if msgpack is not None:
+        parsers.append(MessagePackParser)
+    parsers.append(BSONParser)
+    return parsers
@@ -0,0 +1,246 @@
+"""
+Compile client supplied filters into Mongo queries checked against a
+content type schema
+
+Conditions are written as <field> or <field>__<operator>, e.g.
+price__gte=10 or status__in=draft,published. Values are coerced with the
+field's validation rules so they compare against what was stored.
+"""
+import datetime
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from .pagination import DEFAULT_SORT
+from .validators import FieldError
+
+
+SYSTEM_FIELDS = ('id', 'created_at', 'updated_at', 'version')
+
+OPERATORS = {
+    'eq': None,
+    'ne': '$ne',
+    'gt': '$gt',
+    'gte': '$gte',
+    'lt': '$lt',
+    'lte': '$lte',
+    'in': '$in',
+    'nin': '$nin',
+    'exists': '$exists',
+}
+
+LIST_OPERATORS = ('in', 'nin')
+
+# Query parameters of the list endpoint that are not filters
+RESERVED_PARAMS = ('cursor', 'page_size', 'fields', 'sort', 'format')
+
+# Sorts that are always backed by an index within a content type, on top
+# of fields flagged `indexed` (see indexes.py)
+INDEXED_SORT_FIELDS = ('created_at',)
+
+
+def _clean_datetime(value):
+    """Parse an ISO date or datetime into the naive UTC form stored in MongoDB"""
+    if isinstance(value, datetime.datetime):
+        parsed = value
+    else:
+        value = str(value)
+        parsed = parse_datetime(value)
+        if parsed is None:
+            date = parse_date(value)
+            if date is None:
+                raise FieldError(f"Invalid date '{value}'")
+            parsed = datetime.datetime.combine(date, datetime.time())
+    if timezone.is_aware(parsed):
+        parsed = timezone.make_naive(parsed, datetime.timezone.utc)
+    return parsed
+
+
+def _clean_boolean(value):
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ('true', '1', 'yes')
+
+
+def _split_key(key):
+    field_name, _, operator = key.partition('__')
+    return field_name, operator or 'eq'
+
+
+def _clean_value(schema, field_name, value):
+    if value is None:
+        return None
+    if field_name in ('created_at', 'updated_at'):
+        return _clean_datetime(value)
+    return schema.fields_by_name[field_name].clean(value)
+
+
+def _compile_condition(schema, key, value):
+    """Return (field_name, mongo condition) for one filter entry"""
+    field_name, operator = _split_key(key)
+
+    if operator not in OPERATORS:
+        raise FieldError(f"Unknown operator '{operator}'")
+    if field_name not in schema.fields_by_name and field_name not in ('created_at', 'updated_at'):
+        raise FieldError(f"Unknown field '{field_name}'")
+
+    if operator == 'exists':
+        return field_name, {'$exists': _clean_boolean(value)}
+
+    if operator in LIST_OPERATORS:
+        values = value.split(',') if isinstance(value, str) else value
+        if not isinstance(values, (list, tuple)):
+            raise FieldError('Expected a list of values')
+        return field_name, {OPERATORS[operator]: [
+            _clean_value(schema, field_name, item) for item in values]}
+
+    value = _clean_value(schema, field_name, value)
+    if operator == 'eq':
+        return field_name, value
+    return field_name, {OPERATORS[operator]: value}
+
+
+def _compile(schema, conditions, error_key):
+    errors = {}
+    query = {}
+
+    for key, value in conditions:
+        try:
+            field_name, condition = _compile_condition(schema, key, value)
+        except FieldError as e:
+            errors[key] = str(e)
+            continue
+
+        existing = query.get(field_name)
+        if isinstance(existing, dict) and isinstance(condition, dict):
+            existing.update(condition)
+        elif field_name in query:
+            errors[key] = f"Conflicting conditions on '{field_name}'"
+        else:
+            query[field_name] = condition
+
+    if errors:
+        raise ValidationError({error_key: errors})
+
+    query['content_type'] = schema.name
+    return query
+
+
+def build_filter(schema, filters):
+    """
+    Compile a {"<field>__<operator>": value} object into a raw Mongo filter
+    scoped to the content type. None matches missing or null values.
+    """
+    if not isinstance(filters, dict):
+        raise ValidationError({'filter': 'Expected an object'})
+
+    return _compile(schema, filters.items(), 'filter')
+
+
+def build_query(schema, query_params, reserved=RESERVED_PARAMS):
+    """Compile the filter parameters of a list request into a raw Mongo filter"""
+    conditions = [
+        (key, value) for key, value in query_params.items()
+        if key not in reserved
+    ]
+    return _compile(schema, conditions, 'filter')
+
+
+def parse_sort(schema, sort_param):
+    """Parse ?sort=-price,title into ((field, direction), ...) pairs"""
+    if not sort_param:
+        return DEFAULT_SORT
+
+    sort = []
+    errors = []
+    for key in sort_param.split(','):
+        key = key.strip()
+        direction = -1 if key.startswith('-') else 1
+        field_name = key.lstrip('-')
+        if field_name in ('created_at', 'updated_at') or field_name in schema.fields_by_name:
+            if field_name not in (field for field, _ in sort):
+                sort.append((field_name, direction))
+        elif field_name:
+            errors.append(field_name)
+
+    if errors:
+        raise ValidationError({'sort': f"Unknown fields: {', '.join(errors)}"})
+
+    return tuple(sort) or DEFAULT_SORT
+
+
+def is_indexed_sort(schema, sort):
+    """Check whether a sort can be served by an index within the content type"""
+    if len(sort) != 1:
+        return False
+    field_name = sort[0][0]
+    if field_name in INDEXED_SORT_FIELDS:
+        return True
+    field = schema.fields_by_name.get(field_name)
+    return field is not None and field.indexed
+
+
+def check_sort(schema, sort, collection):
+    """
+    Reject sorts that would need an in-memory sort over more than
+    CONTENT_UNINDEXED_SORT_LIMIT documents
+    """
+    if is_indexed_sort(schema, sort):
+        return
+
+    limit = settings.CONTENT_UNINDEXED_SORT_LIMIT
+    count = collection.count_documents({'content_type': schema.name}, limit=limit + 1)
+    _check_sort_count(count, limit)
+
+
+async def acheck_sort(schema, sort, collection):
+    """check_sort() on a Motor collection"""
+    if is_indexed_sort(schema, sort):
+        return
+
+    limit = settings.CONTENT_UNINDEXED_SORT_LIMIT
+    count = await collection.count_documents({'content_type': schema.name}, limit=limit + 1)
+    _check_sort_count(count, limit)
+
+
+def _check_sort_count(count, limit):
+    if count > limit:
+        raise ValidationError({
+            'sort': f"Sorting on unindexed fields is limited to content types "
+                    f"with at most {limit} entries"
+        })
+
+
+def parse_fields(schema, fields_param):
+    """
+    Parse a ?fields=a,b sparse fieldset into a list of field names.
+    Returns None when no fieldset was requested; 'id' is always included.
+    """
+    if not fields_param:
+        return None
+
+    fields = ['id']
+    unknown = []
+    for field_name in fields_param.split(','):
+        field_name = field_name.strip()
+        if not field_name or field_name in fields:
+            continue
+        if field_name in SYSTEM_FIELDS or field_name in schema.fields_by_name:
+            fields.append(field_name)
+        else:
+            unknown.append(field_name)
+
+    if unknown:
+        raise ValidationError({'fields': f"Unknown fields: {', '.join(unknown)}"})
+
+    return fields
+
+
+def field_projection(fields, sort=()):
+    """Mongo projection loading a sparse fieldset plus the sort keys, or None for everything"""
+    if fields is None:
+        return None
+    projection = {field: 1 for field in fields if field != 'id'}
+    projection.update((field, 1) for field, _ in sort)
+    return projection
@@ -0,0 +1,102 @@
+"""
+Binary renderers for service-to-service consumers of the content API
+
+MessagePack needs the optional `msgpack` package and is only offered when it
+is installed. BSON comes with pymongo; BSON responses carry stored documents
+as they are (_id as an ObjectId, native dates and decimals) so pages read as
+RawBSONDocument are copied into the response without being decoded.
+"""
+import datetime
+import decimal
+from collections.abc import Mapping
+
+import bson
+from bson import ObjectId, Decimal128
+from bson.codec_options import CodecOptions, TypeRegistry
+from django.utils.encoding import force_str
+from django.utils.functional import Promise
+from rest_framework.renderers import BaseRenderer
+from rest_framework.settings import api_settings
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+def _msgpack_default(value):
+    """Encode the values JSONEncoder handles that msgpack doesn't know about"""
+    if isinstance(value, datetime.datetime):
+        representation = value.isoformat()
+        if representation.endswith('+00:00'):
+            representation = representation[:-6] + 'Z'
+        return representation
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Decimal128):
+        value = value.to_decimal()
+    if isinstance(value, decimal.Decimal):
+        return str(value) if api_settings.COERCE_DECIMAL_TO_STRING else float(value)
+    if isinstance(value, (ObjectId, Promise)):
+        return force_str(value)
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not MessagePack serializable")
+
+
+class MessagePackRenderer(BaseRenderer):
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_msgpack_default, use_bin_type=True)
+
+
+def _bson_fallback(value):
+    """Encode the non-BSON values that show up in API responses"""
+    if isinstance(value, decimal.Decimal):
+        return Decimal128(value)
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, Promise):
+        return force_str(value)
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    return value
+
+
+BSON_CODEC_OPTIONS = CodecOptions(
+    type_registry=TypeRegistry(fallback_encoder=_bson_fallback))
+
+
+class BSONRenderer(BaseRenderer):
+    """
+    Render the response as one BSON document. BSON has no top level arrays,
+    so list payloads are wrapped as {"results": [...]}.
+    """
+    media_type = 'application/bson'
+    format = 'bson'
+    charset = None
+    render_style = 'binary'
+    # Views hand stored documents through untouched (see views.py)
+    raw_documents = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        if not isinstance(data, Mapping):
+            data = {'results': data}
+        return bson.encode(data, codec_options=BSON_CODEC_OPTIONS)
+
+
+def content_renderer_classes():
+    """JSON and the browsable API from the settings, plus the binary formats"""
+    renderers = list(api_settings.DEFAULT_RENDERER_CLASSES)
+    if msgpack is not None:
+        renderers.append(MessagePackRenderer)
+    renderers.append(BSONRenderer)
+    return renderers
@@ -0,0 +1,192 @@
+"""
+Versioned cache of rendered content reads
+
+List and detail responses are stored in the `content` cache (see CACHES in
+settings.py, a bounded in-process LRU by default) under a key made of the
+content type, its write version and schema version, and the request path
+and Accept header. Every write path bumps the write version (see stats.py),
+so a write makes all cached reads of its content type unreachable at once,
+without deleting or scanning keys; they age out of the LRU.
+
+Hits skip the content query and rendering; they still look up the schema
+(from the registry) and read the stats document of the content type, whose
+version is part of the key. Hit and miss counters of this process are
+reported by the _health endpoint.
+"""
+import functools
+import hashlib
+import inspect
+import os
+import threading
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse
+from django.template.response import SimpleTemplateResponse
+from rest_framework.exceptions import ValidationError
+from .stats import get_stats, aget_stats
+from .validators import get_content_schema, aget_content_schema
+
+
+CACHE_ALIAS = 'content'
+
+# Representations that are the same for every client; the browsable API
+# embeds the user and a CSRF token
+CACHEABLE_FORMATS = ('json', 'msgpack', 'bson')
+
+
+class CacheMetrics:
+    """Per-process hit / miss counters of the content caches"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.counters = {}
+
+    def _count(self, cache_name, outcome):
+        with self._lock:
+            counters = self.counters.setdefault(cache_name, {'hits': 0, 'misses': 0})
+            counters[outcome] += 1
+
+    def hit(self, cache_name):
+        self._count(cache_name, 'hits')
+
+    def miss(self, cache_name):
+        self._count(cache_name, 'misses')
+
+    def stats(self):
+        with self._lock:
+            stats = {name: dict(counters) for name, counters in self.counters.items()}
+        for counters in stats.values():
+            lookups = counters['hits'] + counters['misses']
+            counters['hit_ratio'] = round(counters['hits'] / lookups, 3) if lookups else None
+        stats['pid'] = os.getpid()
+        return stats
+
+
+cache_metrics = CacheMetrics()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=cache_metrics.reset)
+
+
+def get_content_cache():
+    return caches[CACHE_ALIAS]
+
+
+def request_stats(request, content_type_name):
+    """get_stats() once per request, shared by the ETag and the cache key"""
+    stats = getattr(request, '_content_stats', None)
+    if stats is None:
+        stats = request._content_stats = get_stats(content_type_name)
+    return stats
+
+
+async def arequest_stats(request, content_type_name):
+    """request_stats() through Motor"""
+    stats = getattr(request, '_content_stats', None)
+    if stats is None:
+        stats = request._content_stats = await aget_stats(content_type_name)
+    return stats
+
+
+def response_cache_key(request, schema, stats):
+    digest = hashlib.md5(
+        '\x1f'.join((request.get_full_path(), request.META.get('HTTP_ACCEPT', ''))).encode(),
+        usedforsecurity=False
+    ).hexdigest()
+    return (
+        f"content-response:{schema.name}:{stats.get('version', 0)}:"
+        f"{schema.version.timestamp()}:{digest}"
+    )
+
+
+def _is_cacheable(request):
+    if not settings.CONTENT_RESPONSE_CACHE:
+        return False
+    # DRF views have negotiated a renderer by now, the async views only serve JSON
+    renderer = getattr(request, 'accepted_renderer', None)
+    return renderer is None or renderer.format in CACHEABLE_FORMATS
+
+
+def _cached(entry):
+    content, content_type = entry
+    return HttpResponse(content, content_type=content_type)
+
+
+def _entry(response):
+    """The (content, content type) to store for a response, or None"""
+    if response.status_code != 200 or response.streaming:
+        return None
+    if len(response.content) > settings.CONTENT_RESPONSE_CACHE_MAX_BYTES:
+        return None
+    return response.content, response['Content-Type']
+
+
+def cached_response(method):
+    """
+    Serve a content read view method from the versioned cache
+
+    Goes below @conditional so 304s are answered before the cache is
+    consulted. Async view methods are supported.
+    """
+    if inspect.iscoroutinefunction(method):
+        @functools.wraps(method)
+        async def async_wrapper(self, request, content_type_name, *args, **kwargs):
+            if not _is_cacheable(request):
+                return await method(self, request, content_type_name, *args, **kwargs)
+            try:
+                schema = await aget_content_schema(content_type_name)
+            except ValidationError:
+                return await method(self, request, content_type_name, *args, **kwargs)
+
+            cache = get_content_cache()
+            key = response_cache_key(
+                request, schema, await arequest_stats(request, content_type_name))
+            entry = await cache.aget(key)
+            if entry is not None:
+                cache_metrics.hit('responses')
+                return _cached(entry)
+
+            cache_metrics.miss('responses')
+            response = await method(self, request, content_type_name, *args, **kwargs)
+            entry = _entry(response)
+            if entry is not None:
+                await cache.aset(key, entry)
+            return response
+        return async_wrapper
+
+    @functools.wraps(method)
+    def wrapper(self, request, content_type_name, *args, **kwargs):
+        if not _is_cacheable(request):
+            return method(self, request, content_type_name, *args, **kwargs)
+        try:
+            schema = get_content_schema(content_type_name)
+        except ValidationError:
+            return method(self, request, content_type_name, *args, **kwargs)
+
+        cache = get_content_cache()
+        key = response_cache_key(request, schema, request_stats(request, content_type_name))
+        entry = cache.get(key)
+        if entry is not None:
+            cache_metrics.hit('responses')
+            return _cached(entry)
+
+        cache_metrics.miss('responses')
+        response = method(self, request, content_type_name, *args, **kwargs)
+
+        def store(response):
+            entry = _entry(response)
+            if entry is not None:
+                cache.set(key, entry)
+
+        # DRF responses are rendered once the view returns
+        if isinstance(response, SimpleTemplateResponse) and not response.is_rendered:
+            response.add_post_render_callback(store)
+        else:
+            store(response)
+        return response
+    return wrapper
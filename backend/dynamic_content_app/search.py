@@ -0,0 +1,67 @@
+"""
+Relevance ranked full-text search within a content type
+
+Searches run as an aggregation over the collection's text index (see
+indexes.py), ordered by text score with _id as the tie-breaker. Pages use the
+same opaque keyset cursors as lists, on the score.
+"""
+from rest_framework.exceptions import ValidationError
+from .mongodb import document_to_dict
+from .pagination import cursor_filter, encode_cursor, get_page_size
+from .query import RESERVED_PARAMS, build_query, field_projection, parse_fields
+
+
+SEARCH_PARAM = 'q'
+
+SEARCH_SORT = (('_score', -1),)
+
+# Query parameters of the search endpoint that are not filters
+SEARCH_RESERVED_PARAMS = RESERVED_PARAMS + (SEARCH_PARAM,)
+
+
+def search(collection, schema, request):
+    """
+    Return (results, next_cursor) for ?q= within a content type, narrowed by
+    the usual <field>__<op> filters. Results carry their relevance score.
+    """
+    text = request.query_params.get(SEARCH_PARAM, '').strip()
+    if not text:
+        raise ValidationError({SEARCH_PARAM: 'This parameter is required'})
+    if not any(field.searchable for field in schema.fields):
+        raise ValidationError({SEARCH_PARAM: f"'{schema.name}' has no searchable fields"})
+
+    query = build_query(schema, request.query_params, reserved=SEARCH_RESERVED_PARAMS)
+    fields = parse_fields(schema, request.query_params.get('fields'))
+    page_size = get_page_size(request)
+
+    query['$text'] = {'$search': text}
+    pipeline = [
+        {'$match': query},
+        {'$addFields': {'_score': {'$meta': 'textScore'}}},
+    ]
+    cursor = request.query_params.get('cursor')
+    if cursor:
+        pipeline.append({'$match': cursor_filter(cursor, SEARCH_SORT)})
+    pipeline += [
+        {'$sort': {'_score': -1, '_id': -1}},
+        {'$limit': page_size + 1},
+    ]
+    projection = field_projection(fields)
+    if projection is not None:
+        pipeline.append({'$project': dict(projection, _score=1)})
+
+    documents = list(collection.aggregate(pipeline))
+
+    next_cursor = None
+    if len(documents) > page_size:
+        documents = documents[:page_size]
+        last = documents[-1]
+        next_cursor = encode_cursor(SEARCH_SORT, [last['_score']], last['_id'])
+
+    results = []
+    for document in documents:
+        score = document.pop('_score')
+        result = document_to_dict(document, fields)
+        result['score'] = score
+        results.append(result)
+    return results, next_cursor
@@ -0,0 +1,58 @@
+"""
+Signal handlers keeping the compiled schema registry, the per-field
+MongoDB indexes and the shape of stored entries in sync with the admin
+"""
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from content_types_app.models import ContentType, ContentTypeField
+from .validators import invalidate_content_schema
+from .indexes import schedule_index_reconcile
+from .evolution import field_operations, schedule_schema_migration
+
+
+@receiver(post_save, sender=ContentType)
+@receiver(post_delete, sender=ContentType)
+def content_type_changed(sender, instance, **kwargs):
+    """Drop the compiled schema of a saved or deleted content type"""
+    invalidate_content_schema(name=instance.name, pk=instance.pk)
+    # Renames and (de)activation change the set of field indexes
+    schedule_index_reconcile()
+
+
+@receiver(pre_save, sender=ContentTypeField)
+def remember_stored_field(sender, instance, **kwargs):
+    """Keep the stored name and type of a field being saved to diff against"""
+    instance._stored_shape = None
+    if instance.pk is not None:
+        instance._stored_shape = ContentTypeField.objects.filter(
+            pk=instance.pk).values_list('field_name', 'field_type').first()
+
+
+@receiver(post_save, sender=ContentTypeField)
+@receiver(post_delete, sender=ContentTypeField)
+def content_type_field_changed(sender, instance, **kwargs):
+    """
+    Bump the parent's updated_at so other processes see the new schema
+    version, drop the local compiled schema, reconcile field indexes and
+    schedule the rewrite of stored entries when the field's shape changed
+    """
+    ContentType.objects.filter(pk=instance.content_type_id).update(
+        updated_at=timezone.now())
+    invalidate_content_schema(pk=instance.content_type_id)
+
+    if kwargs['signal'] is post_save:
+        ContentTypeField.objects.filter(pk=instance.pk).update(
+            index_status='pending' if instance.indexed else '')
+    schedule_index_reconcile()
+
+    # Bring stored entries to a renamed, retyped or removed field's new shape
+    if kwargs['signal'] is post_save:
+        stored = getattr(instance, '_stored_shape', None)
+        operations = field_operations(stored, instance) if stored else []
+    else:
+        operations = field_operations((instance.field_name, instance.field_type), None)
+    content_type_name = ContentType.objects.filter(
+        pk=instance.content_type_id).values_list('name', flat=True).first()
+    if operations and content_type_name is not None:
+        schedule_schema_migration(instance.content_type_id, content_type_name, operations)
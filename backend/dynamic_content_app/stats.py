@@ -0,0 +1,110 @@
+"""
+Incrementally maintained per content type statistics
+
+Every write path reports what it did here; the counters and the write
+version live in the content_type_stats collection and are updated with a
+single atomic $inc. rebuild_stats() recomputes the counts from the stored
+entries (one $group aggregation over dynamic_contents, plus a count per
+dedicated collection) in case they ever drift, e.g. after manual edits.
+"""
+import datetime
+
+from pymongo import UpdateOne
+from content_types_app.models import ContentType
+from .mongodb import ContentTypeStats, get_content_collection, content_collection_name
+from .async_mongodb import get_async_stats_collection
+
+
+def get_stats_collection():
+    return ContentTypeStats._get_collection()
+
+
+def _record_write(content_type_name, count_delta=0):
+    get_stats_collection().update_one(
+        {'_id': content_type_name},
+        {
+            '$inc': {'count': count_delta, 'version': 1},
+            '$set': {'modified_at': datetime.datetime.utcnow()},
+        },
+        upsert=True
+    )
+
+
+def content_created(content_type_name, count=1):
+    """Record that count entries of a content type were inserted"""
+    if count:
+        _record_write(content_type_name, count)
+
+
+def content_updated(content_type_name, count=1):
+    """Record that count entries of a content type were modified"""
+    if count:
+        _record_write(content_type_name)
+
+
+def content_deleted(content_type_name, count=1):
+    """Record that count entries of a content type were deleted"""
+    if count:
+        _record_write(content_type_name, -count)
+
+
+def get_stats(content_type_name):
+    """Return the stats document of a content type (empty if never written)"""
+    return get_stats_collection().find_one({'_id': content_type_name}) or {}
+
+
+def get_counts(content_type_names):
+    """Return {content type name: entry count} with one query"""
+    stats = get_stats_collection().find(
+        {'_id': {'$in': list(content_type_names)}}, {'count': 1})
+    return {document['_id']: document.get('count', 0) for document in stats}
+
+
+async def aget_stats(content_type_name):
+    """get_stats() through Motor"""
+    return await get_async_stats_collection().find_one({'_id': content_type_name}) or {}
+
+
+async def aget_counts(content_type_names):
+    """get_counts() through Motor"""
+    stats = get_async_stats_collection().find(
+        {'_id': {'$in': list(content_type_names)}}, {'count': 1})
+    return {document['_id']: document.get('count', 0) async for document in stats}
+
+
+def rebuild_stats():
+    """Recompute every counter from the stored entries, returning {name: count}"""
+    dedicated = ContentType.objects.filter(
+        storage_mode='dedicated').values_list('name', flat=True)
+
+    # Entries of dedicated types left in dynamic_contents by an unfinished
+    # storage migration are not counted
+    counts = {
+        group['_id']: group['count']
+        for group in get_content_collection().aggregate([
+            {'$match': {'content_type': {'$nin': list(dedicated)}}},
+            {'$group': {'_id': '$content_type', 'count': {'$sum': 1}}},
+        ])
+    }
+    for name in dedicated:
+        collection = get_content_collection(content_collection_name(name, 'dedicated'))
+        counts[name] = collection.count_documents({'content_type': name})
+
+    collection = get_stats_collection()
+    stale = [
+        document['_id'] for document in collection.find({}, {'_id': 1})
+        if document['_id'] not in counts
+    ]
+    # Only the counts are rebuilt, write versions keep increasing
+    operations = [
+        UpdateOne({'_id': name}, {'$set': {'count': count}}, upsert=True)
+        for name, count in counts.items()
+    ]
+    operations += [
+        UpdateOne({'_id': name}, {'$set': {'count': 0}})
+        for name in stale
+    ]
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+
+    return counts
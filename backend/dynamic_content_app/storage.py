@@ -0,0 +1,259 @@
+"""
+Online moves of a content type between the shared dynamic_contents
+collection and a dedicated content_<name> collection
+
+A move runs in phases, its position saved after every batch in the
+content_storage_migrations collection so an interrupted run resumes where it
+stopped:
+
+copy      copy every entry to the new collection in _id order
+catch_up  copy again the entries updated since the copy started
+prune     remove copies of entries deleted since the copy started
+cutover   switch ContentType.storage_mode to the new collection
+final     wait CONTENT_SCHEMA_TTL for every process to switch, then bring
+          over what was written to the old collection in the meantime,
+          except entries deleted through the new collection
+final_prune
+          remove copies of entries deleted from the old collection meanwhile
+purge     delete the entries from the old collection
+
+Until the cutover every read and write uses the old collection, so the
+content type stays online throughout. Copies are upserts by _id and can be
+repeated safely.
+"""
+import datetime
+import logging
+import time
+
+from django.conf import settings
+from pymongo import InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError
+from content_types_app.models import ContentTypeField
+from .indexes import field_index, text_index, searchable_fields
+from .mongodb import content_collection_name, get_content_collection, drop_content_collection
+
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_COLLECTION = 'content_storage_migrations'
+
+PHASES = ('copy', 'catch_up', 'prune', 'cutover', 'final', 'final_prune', 'purge', 'done')
+
+STORAGE_MODES = ('shared', 'dedicated')
+
+# Extra seconds on top of CONTENT_SCHEMA_TTL before the old collection is
+# considered out of use
+CUTOVER_GRACE = 5
+
+
+class StorageMigrationError(Exception):
+    """Raised when a move can't be started or resumed"""
+
+
+def get_migrations_collection():
+    return get_content_collection().database[MIGRATIONS_COLLECTION]
+
+
+def get_migration(content_type_name):
+    """Return the saved state of a content type's last move, or None"""
+    return get_migrations_collection().find_one({'_id': content_type_name})
+
+
+class StorageMigration:
+    """Move the entries of one content type to another storage mode"""
+
+    def __init__(self, content_type, target, batch_size=1000, pause=0.0, log=logger.info):
+        if target not in STORAGE_MODES:
+            raise StorageMigrationError(f"Unknown storage mode '{target}'")
+
+        self.content_type = content_type
+        self.name = content_type.name
+        self.batch_size = batch_size
+        self.pause = pause
+        self.log = log
+
+        state = get_migration(self.name)
+        if state is not None and state['phase'] != 'done':
+            if state['target'] != target:
+                raise StorageMigrationError(
+                    f"A move of '{self.name}' to {state['target']} storage is in progress")
+        elif content_type.storage_mode == target:
+            state = None
+        else:
+            state = {
+                '_id': self.name,
+                'source': content_type.storage_mode,
+                'target': target,
+                'phase': 'copy',
+                'last_id': None,
+                'copied': 0,
+                'started_at': datetime.datetime.utcnow(),
+            }
+            get_migrations_collection().replace_one({'_id': self.name}, state, upsert=True)
+        self.state = state
+
+        if state is not None:
+            self.source = get_content_collection(content_collection_name(self.name, state['source']))
+            self.target = get_content_collection(content_collection_name(self.name, state['target']))
+
+    def _save(self, **changes):
+        changes['updated_at'] = datetime.datetime.utcnow()
+        self.state.update(changes)
+        get_migrations_collection().update_one({'_id': self.name}, {'$set': changes})
+
+    def _batches(self, collection, query, projection=None):
+        """Yield batches in _id order from the saved position, saving it after each"""
+        while True:
+            batch_query = dict(query, content_type=self.name)
+            if self.state['last_id'] is not None:
+                batch_query['_id'] = {'$gt': self.state['last_id']}
+            batch = list(
+                collection.find(batch_query, projection).sort('_id', 1).limit(self.batch_size))
+            if not batch:
+                return
+            yield batch
+            self._save(last_id=batch[-1]['_id'])
+            if self.pause:
+                time.sleep(self.pause)
+
+    def _next_phase(self, phase, **changes):
+        self._save(phase=phase, last_id=None, **changes)
+
+    def run(self):
+        """Run the remaining phases; returns False when there was nothing to move"""
+        if self.state is None:
+            return False
+
+        while self.state['phase'] != 'done':
+            phase = self.state['phase']
+            self.log(f"{self.name}: {phase}")
+            getattr(self, f"_{phase}")()
+        self.log(f"{self.name}: entries live in {self.target.name}")
+        return True
+
+    def _build_indexes(self):
+        fields = ContentTypeField.objects.filter(
+            content_type=self.content_type, indexed=True
+        ).select_related('content_type')
+        for field in fields:
+            keys, options = field_index(field, self.target.name)
+            self.target.create_index(keys, **options)
+
+        # The shared collection's text index spans content types, the
+        # reconcile after the cutover takes care of it
+        if self.state['target'] == 'dedicated':
+            index = text_index(searchable_fields(content_type=self.content_type))
+            if index is not None:
+                self.target.create_index(index[0], **index[1])
+
+    def _copy(self):
+        # Field indexes are built before the cutover so reads stay fast
+        self._build_indexes()
+
+        copied = self.state['copied']
+        for batch in self._batches(self.source, {}):
+            self.target.bulk_write(
+                [ReplaceOne({'_id': document['_id']}, document, upsert=True) for document in batch],
+                ordered=False
+            )
+            copied += len(batch)
+            self._save(copied=copied)
+            self.log(f"{self.name}: copied {copied} entries")
+
+        self._next_phase('catch_up', catch_up_started_at=datetime.datetime.utcnow())
+
+    def _catch_up(self):
+        query = {'updated_at': {'$gte': self.state['started_at']}}
+        for batch in self._batches(self.source, query):
+            self.target.bulk_write(
+                [ReplaceOne({'_id': document['_id']}, document, upsert=True) for document in batch],
+                ordered=False
+            )
+            self.log(f"{self.name}: caught up {len(batch)} updated entries")
+
+        self._next_phase('prune')
+
+    def _prune_deleted(self, query):
+        for batch in self._batches(self.target, query, {'_id': 1}):
+            ids = [document['_id'] for document in batch]
+            remaining = {
+                document['_id'] for document in
+                self.source.find({'_id': {'$in': ids}}, {'_id': 1})
+            }
+            deleted = [object_id for object_id in ids if object_id not in remaining]
+            if deleted:
+                self.target.delete_many({'_id': {'$in': deleted}})
+                self.log(f"{self.name}: removed {len(deleted)} deleted entries")
+
+    def _prune(self):
+        self._prune_deleted({})
+        self._next_phase('cutover')
+
+    def _cutover(self):
+        self.content_type.refresh_from_db()
+        self.content_type.storage_mode = self.state['target']
+        # Saving bumps updated_at, which other processes check after CONTENT_SCHEMA_TTL
+        self.content_type.save(update_fields=['storage_mode', 'updated_at'])
+        self._next_phase('final', switched_at=datetime.datetime.utcnow())
+
+    def _final(self):
+        wait_until = self.state['switched_at'] + datetime.timedelta(
+            seconds=settings.CONTENT_SCHEMA_TTL + CUTOVER_GRACE)
+        remaining = (wait_until - datetime.datetime.utcnow()).total_seconds()
+        if remaining > 0:
+            self.log(f"{self.name}: waiting {remaining:.0f}s for every process to switch")
+            time.sleep(remaining)
+
+        # Writes that reached the old collection after the catch-up: newer wins.
+        # Entries created before the catch-up were all in the new collection
+        # by the switch, so when one is missing there now it was deleted
+        # through the new collection and must not come back.
+        catch_up_started_at = self.state['catch_up_started_at']
+        query = {'updated_at': {'$gte': catch_up_started_at}}
+        for batch in self._batches(self.source, query):
+            current = {
+                document['_id']: document['updated_at'] for document in
+                self.target.find({'_id': {'$in': [d['_id'] for d in batch]}}, {'updated_at': 1})
+            }
+            operations = []
+            for document in batch:
+                if document['_id'] not in current:
+                    if document['created_at'] >= catch_up_started_at:
+                        operations.append(InsertOne(document))
+                elif current[document['_id']] < document['updated_at']:
+                    operations.append(ReplaceOne(
+                        {'_id': document['_id'], 'updated_at': current[document['_id']]},
+                        document
+                    ))
+            if operations:
+                try:
+                    self.target.bulk_write(operations, ordered=False)
+                except BulkWriteError:
+                    # Lost a race with a write to the new collection, which is newer
+                    pass
+                self.log(f"{self.name}: synced {len(operations)} late writes")
+
+        self._next_phase('final_prune')
+
+    def _final_prune(self):
+        # Entries that existed before the switch and were deleted from the old collection
+        self._prune_deleted({'created_at': {'$lt': self.state['switched_at']}})
+        self._next_phase('purge')
+
+    def _purge(self):
+        if self.state['source'] == 'dedicated':
+            drop_content_collection(self.source.name)
+        else:
+            while True:
+                ids = [
+                    document['_id'] for document in
+                    self.source.find({'content_type': self.name}, {'_id': 1}).limit(self.batch_size)
+                ]
+                if not ids:
+                    break
+                self.source.delete_many({'_id': {'$in': ids}})
+                self.log(f"{self.name}: purged {len(ids)} entries from {self.source.name}")
+                if self.pause:
+                    time.sleep(self.pause)
+
+        self._next_phase('done', finished_at=datetime.datetime.utcnow())
@@ -0,0 +1,201 @@
+import datetime
+from unittest import mock, skipUnless
+
+from bson import ObjectId
+from django.test import RequestFactory, SimpleTestCase, override_settings
+from rest_framework.exceptions import ValidationError
+from . import changes
+from .evolution import SchemaMigration
+from .pagination import cursor_filter, encode_cursor, paginate
+
+try:
+    import mongomock
+except ImportError:
+    mongomock = None
+
+
+@skipUnless(mongomock, 'mongomock is not installed')
+class CursorPaginationTests(SimpleTestCase):
+    """Walking every page returns each document once, in the order of a plain sorted find"""
+
+    def setUp(self):
+        self.collection = mongomock.MongoClient().db.entries
+        created_at = datetime.datetime(2024, 1, 1)
+        statuses = ['draft', 'published', None]
+        prices = [3.0, 1.0, None, 2.0]
+        documents = []
+        for i in range(24):
+            document = {
+                '_id': ObjectId(),
+                # Pairs of equal timestamps, so _id has to break ties
+                'created_at': created_at + datetime.timedelta(minutes=i // 2),
+                'status': statuses[i % 3],
+            }
+            # Every fourth document has no price at all, others an explicit null
+            if i % 8 != 7:
+                document['price'] = prices[i % 4]
+            documents.append(document)
+        self.collection.insert_many(documents)
+
+    def walk(self, sort, page_size=5):
+        keys = list(sort) + [('_id', sort[-1][1])]
+        expected = [document['_id'] for document in self.collection.find().sort(keys)]
+
+        seen = []
+        cursor = None
+        for _ in range(len(expected) + 1):
+            params = {'page_size': page_size}
+            if cursor:
+                params['cursor'] = cursor
+            request = RequestFactory().get('/', params)
+            documents, cursor = paginate(self.collection, {}, request, sort)
+            seen += [document['_id'] for document in documents]
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_default_sort_with_ties(self):
+        self.walk((('created_at', -1),))
+
+    def test_ascending_with_nulls(self):
+        self.walk((('price', 1),))
+
+    def test_descending_with_nulls(self):
+        self.walk((('price', -1),))
+
+    def test_mixed_directions_with_nulls(self):
+        self.walk((('status', 1), ('price', -1)))
+        self.walk((('status', -1), ('price', 1)), page_size=2)
+
+    def test_page_size_one(self):
+        self.walk((('status', -1), ('created_at', 1)), page_size=1)
+
+    def test_cursor_of_another_sort_is_rejected(self):
+        cursor = encode_cursor((('price', 1),), [1.0], ObjectId())
+        with self.assertRaises(ValidationError):
+            cursor_filter(cursor, (('price', -1),))
+        with self.assertRaises(ValidationError):
+            cursor_filter('not-a-cursor', (('price', 1),))
+
+
+@override_settings(CONTENT_CHANGES_BUFFER=5, CONTENT_CHANGES_SOURCE='hook')
+class PublishCreatedTests(SimpleTestCase):
+    """A bulk create only serializes the documents that fit in the buffer"""
+
+    def setUp(self):
+        changes.hub.reset()
+        self.addCleanup(changes.hub.reset)
+
+    def documents(self, count):
+        return [{'_id': ObjectId(), 'created_at': datetime.datetime(2024, 1, 1)} for _ in range(count)]
+
+    def test_only_the_tail_is_serialized(self):
+        changes.publish_created('post', self.documents(1))
+        documents = self.documents(12)
+        with mock.patch.object(
+                changes, 'document_to_dict', wraps=changes.document_to_dict) as document_to_dict:
+            changes.publish_created('post', documents)
+        self.assertEqual(document_to_dict.call_count, 5)
+
+        self.assertEqual(changes.hub.last_sequence(), 13)
+        events = changes.hub.since('post', 8)
+        self.assertEqual([number for number, _ in events], [9, 10, 11, 12, 13])
+        self.assertEqual(
+            [event['id'] for _, event in events],
+            [str(document['_id']) for document in documents[-5:]]
+        )
+        # A client from before the skipped events has to start over
+        self.assertIsNone(changes.hub.since('post', 1))
+        self.assertIsNone(changes.hub.since('post', 7))
+
+    def test_small_batches_are_published_whole(self):
+        changes.publish_created('post', self.documents(3))
+        self.assertEqual(len(changes.hub.since('post', 0)), 3)
+
+
+def migration(*operations):
+    return SchemaMigration({'_id': ObjectId(), 'content_type': 'post', 'operations': list(operations)})
+
+
+def convert(field, to_type, choices=None):
+    return {
+        'op': 'convert', 'field': field, 'from_type': 'text', 'to_type': to_type,
+        'display_name': field.title(), 'choices': choices,
+    }
+
+
+class SchemaRewriteTests(SimpleTestCase):
+    """rewrite() returns the $set / $unset that bring an entry to the new shape"""
+
+    def test_rename(self):
+        rename = {'op': 'rename', 'from': 'old', 'to': 'new'}
+        self.assertEqual(
+            migration(rename).rewrite({'_id': 1, 'old': 'v'}),
+            ({'new': 'v'}, {'old': ''}, None)
+        )
+        # A value already written under the new name wins
+        self.assertEqual(
+            migration(rename).rewrite({'_id': 1, 'old': 'v', 'new': 'w'}),
+            ({}, {'old': ''}, None)
+        )
+
+    def test_convert(self):
+        job = migration(convert('price', 'number'))
+        self.assertEqual(job.rewrite({'_id': 1, 'price': '12.5'}), ({'price': 12.5}, {}, None))
+        self.assertEqual(job.rewrite({'_id': 1, 'price': ''}), ({}, {'price': ''}, None))
+        self.assertEqual(job.rewrite({'_id': 1, 'price': None}), ({}, {}, None))
+        self.assertEqual(
+            job.rewrite({'_id': 1, 'price': 'cheap'}), ({}, {}, ('price', 'cheap')))
+
+    def test_remove(self):
+        job = migration({'op': 'remove', 'field': 'body'})
+        self.assertEqual(job.rewrite({'_id': 1, 'body': 'x'}), ({}, {'body': ''}, None))
+        self.assertEqual(job.rewrite({'_id': 1}), ({}, {}, None))
+
+
+@skipUnless(mongomock, 'mongomock is not installed')
+class SchemaWriteTests(SimpleTestCase):
+    """_write() rewrites entries edited between the read and the bulk_write from their new state"""
+
+    def setUp(self):
+        self.collection = mongomock.MongoClient().db.entries
+        self.collection.insert_many([
+            {'_id': i, 'old': f'v{i}', 'other': 0, 'version': 1} for i in (1, 2, 3)
+        ])
+        self.job = migration({'op': 'rename', 'from': 'old', 'to': 'new'})
+
+    def edit_before_first_write(self, update):
+        bulk_write = self.collection.bulk_write
+        edits = [update]
+
+        def edited_bulk_write(*args, **kwargs):
+            if edits:
+                self.collection.update_one({'_id': 1}, edits.pop())
+            return bulk_write(*args, **kwargs)
+        return mock.patch.object(self.collection, 'bulk_write', edited_bulk_write)
+
+    def write(self):
+        documents = list(self.collection.find({}, self.job._projection()))
+        return self.job._write(self.collection, documents)
+
+    def assert_renamed(self, first='v1'):
+        for document in self.collection.find():
+            self.assertNotIn('old', document)
+            self.assertEqual(document['new'], first if document['_id'] == 1 else f"v{document['_id']}")
+
+    def test_without_conflicts(self):
+        self.assertEqual(self.write(), 3)
+        self.assert_renamed()
+        self.assertEqual({d['version'] for d in self.collection.find()}, {2})
+
+    def test_concurrent_patch_is_rewritten(self):
+        # Bumps the version by one, just like the rewrite would have
+        with self.edit_before_first_write({'$inc': {'other': 1, 'version': 1}}):
+            self.assertEqual(self.write(), 3)
+        self.assert_renamed()
+        self.assertEqual(self.collection.find_one({'_id': 1})['other'], 1)
+
+    def test_concurrent_put_is_rewritten_from_its_new_state(self):
+        with self.edit_before_first_write({'$set': {'old': 'edited'}, '$inc': {'version': 1}}):
+            self.assertEqual(self.write(), 3)
+        self.assert_renamed(first='edited')
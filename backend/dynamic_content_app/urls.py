@@ -1,15 +1,41 @@
+from django.conf import settings
 from django.urls import path
 from .views import (
     DynamicContentListView,
     DynamicContentDetailView,
-    ContentTypeDataView
+    DynamicContentBulkView,
+    DynamicContentSearchView,
+    DynamicContentAggregateView,
+    ContentTypeDataView,
+    MongoHealthView
 )
+from .export import DynamicContentExportView
+from .change_feed import ContentChangesView
+
+if settings.CONTENT_ASYNC_VIEWS:
+    # Native async reads for ASGI deployments, writes still reach the DRF views
+    from . import async_views
+    ListView = async_views.AsyncDynamicContentListView
+    DetailView = async_views.AsyncDynamicContentDetailView
+    OverviewView = async_views.AsyncContentTypeDataView
+else:
+    ListView = DynamicContentListView
+    DetailView = DynamicContentDetailView
+    OverviewView = ContentTypeDataView
 
 urlpatterns = [
     # Overview of all content
-    path('', ContentTypeDataView.as_view(), name='content-overview'),
+    path('', OverviewView.as_view(), name='content-overview'),
+    
+    # MongoDB health and pool stats (content type names never start with _)
+    path('_health/', MongoHealthView.as_view(), name='content-health'),
     
     # Content type specific endpoints
-    path('<str:content_type_name>/', DynamicContentListView.as_view(), name='content-list'),
-    path('<str:content_type_name>/<str:content_id>/', DynamicContentDetailView.as_view(), name='content-detail'),
+    path('<str:content_type_name>/', ListView.as_view(), name='content-list'),
+    path('<str:content_type_name>/bulk/', DynamicContentBulkView.as_view(), name='content-bulk'),
+    path('<str:content_type_name>/search/', DynamicContentSearchView.as_view(), name='content-search'),
+    path('<str:content_type_name>/aggregate/', DynamicContentAggregateView.as_view(), name='content-aggregate'),
+    path('<str:content_type_name>/changes/', ContentChangesView.as_view(), name='content-changes'),
+    path('<str:content_type_name>/export/', DynamicContentExportView.as_view(), name='content-export'),
+    path('<str:content_type_name>/<str:content_id>/', DetailView.as_view(), name='content-detail'),
 ]
@@ -1,79 +1,255 @@
 """
 Validators for dynamic content based on content type schema
+
+Each content type's schema is compiled once into a ContentSchema holding a
+precomputed coercer per field, and kept in a process-local registry. Entries
+are invalidated by the signal handlers in signals.py and revalidated against
+ContentType.updated_at once they are older than CONTENT_SCHEMA_TTL, so other
+processes pick up admin changes without a query on every write.
 """
+import threading
+import time
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from content_types_app.models import ContentType
 from rest_framework.exceptions import ValidationError
+from .mongodb import content_collection_name
 
 
-def validate_dynamic_content(content_type_name, data):
-    """
-    Validate submitted data against a content type schema
-    """
+class FieldError(Exception):
+    """Raised by a coercer when a value is rejected with a specific message"""
+
+
+def _coerce_number(field):
+    return float
+
+
+def _coerce_boolean(field):
+    def coerce(value):
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str):
+            return value.lower() in ('true', '1', 'yes')
+        return bool(value)
+    return coerce
+
+
+def _coerce_email(field):
+    message = f"{field.display_name} must be a valid email"
+
+    def coerce(value):
+        value = str(value)
+        # Basic email validation
+        if '@' not in value:
+            raise FieldError(message)
+        return value
+    return coerce
+
+
+def _coerce_select(field):
+    # Choices are stored as [{"value": ..., "option": ...}] by the admin,
+    # plain strings are accepted as well
+    choices = frozenset(
+        choice['value'] if isinstance(choice, dict) else choice
+        for choice in field.choices or []
+    )
+    if not choices:
+        return lambda value: value
+
+    message = f"{field.display_name} must be one of: {', '.join(sorted(map(str, choices)))}"
+
+    def coerce(value):
+        try:
+            if value in choices:
+                return value
+        except TypeError:
+            pass
+        raise FieldError(message)
+    return coerce
+
+
+def _coerce_text(field):
+    return str
+
+
+COERCERS = {
+    'number': _coerce_number,
+    'boolean': _coerce_boolean,
+    'email': _coerce_email,
+    'select': _coerce_select,
+}
+
+
+class CompiledField:
+    """A ContentTypeField reduced to what validation needs"""
+    __slots__ = (
+        'name', 'display_name', 'field_type', 'required', 'default', 'indexed',
+        'searchable', 'coerce'
+    )
+
+    def __init__(self, field):
+        self.name = field.field_name
+        self.display_name = field.display_name
+        self.field_type = field.field_type
+        self.required = field.is_required
+        self.default = field.default_value
+        self.indexed = field.indexed
+        self.searchable = field.field_type in ('text', 'textarea') and field.search_weight > 0
+        # text, textarea, date
+        self.coerce = COERCERS.get(field.field_type, _coerce_text)(field)
+
+    def clean(self, value):
+        """Coerce a non-empty value, raising FieldError with a user-facing message"""
+        try:
+            return self.coerce(value)
+        except (ValueError, TypeError) as e:
+            raise FieldError(f"Invalid value for {self.display_name}: {str(e)}")
+
+
+class ContentSchema:
+    """Compiled validator for one content type"""
+
+    def __init__(self, content_type, fields):
+        self.pk = content_type.pk
+        self.name = content_type.name
+        self.display_name = content_type.display_name
+        self.version = content_type.updated_at
+        self.storage_mode = content_type.storage_mode
+        self.collection_name = content_collection_name(self.name, self.storage_mode)
+        self.fields = tuple(CompiledField(field) for field in fields)
+        self.fields_by_name = {field.name: field for field in self.fields}
+        self.checked_at = time.monotonic()
+
+    def validate(self, data, partial=False):
+        """
+        Validate submitted data, returning the coerced values
+
+        With partial=True only the supplied fields are checked, unknown keys
+        are rejected and optional fields given an empty value map to None so
+        callers can unset them.
+        """
+        errors = {}
+        validated_data = {}
+
+        if partial:
+            fields = []
+            for field_name in data:
+                field = self.fields_by_name.get(field_name)
+                if field is None:
+                    errors[field_name] = f"Unknown field '{field_name}'"
+                else:
+                    fields.append(field)
+        else:
+            fields = self.fields
+
+        for field in fields:
+            field_name = field.name
+            field_value = data.get(field_name)
+
+            if field_value is None or field_value == '':
+                # Check required fields
+                if field.required:
+                    errors[field_name] = f"{field.display_name} is required"
+                # Skip validation for optional empty fields
+                elif field.default:
+                    validated_data[field_name] = field.default
+                elif partial:
+                    validated_data[field_name] = None
+                continue
+
+            try:
+                validated_data[field_name] = field.clean(field_value)
+            except FieldError as e:
+                errors[field_name] = str(e)
+
+        if errors:
+            raise ValidationError(errors)
+
+        return validated_data
+
+
+_registry = {}
+_lock = threading.Lock()
+
+
+def _compile(content_type_name):
     try:
-        content_type = ContentType.objects.get(
+        content_type = ContentType.objects.prefetch_related('fields').get(
             name=content_type_name, is_active=True)
     except ContentType.DoesNotExist:
         raise ValidationError(
             f"Content type '{content_type_name}' not found or not active")
 
-    errors = {}
-    validated_data = {}
+    return ContentSchema(content_type, content_type.fields.all())
 
-    # Get all fields for this content type
-    fields = content_type.fields.all()
 
-    for field in fields:
-        field_name = field.field_name
-        field_value = data.get(field_name)
+def _is_fresh(schema):
+    return time.monotonic() - schema.checked_at < settings.CONTENT_SCHEMA_TTL
 
-        # Check required fields
-        if field.is_required and (field_value is None or field_value == ''):
-            errors[field_name] = f"{field.display_name} is required"
-            continue
 
-        # Skip validation for optional empty fields
-        if field_value is None or field_value == '':
-            if field.default_value:
-                validated_data[field_name] = field.default_value
-            continue
+def _version_query(schema):
+    return ContentType.objects.filter(
+        name=schema.name, is_active=True
+    ).values_list('updated_at', flat=True)
 
-        # Type-specific validation
-        try:
-            if field.field_type == 'number':
-                validated_data[field_name] = float(field_value)
-
-            elif field.field_type == 'boolean':
-                if isinstance(field_value, bool):
-                    validated_data[field_name] = field_value
-                elif isinstance(field_value, str):
-                    validated_data[field_name] = field_value.lower() in [
-                        'true', '1', 'yes']
-                else:
-                    validated_data[field_name] = bool(field_value)
 
-            elif field.field_type == 'email':
-                # Basic email validation
-                if '@' not in str(field_value):
-                    errors[field_name] = f"{field.display_name} must be a valid email"
-                else:
-                    validated_data[field_name] = str(field_value)
+def _matches_version(schema, version):
+    if version is None or version != schema.version:
+        return False
 
-            elif field.field_type == 'select':
-                choices = [x['value'] for x in field.choices]
+    schema.checked_at = time.monotonic()
+    return True
 
-                if field.choices and field_value not in choices:
-                    errors[
-                        field_name] = f"{field.display_name} must be one of: {', '.join(field.choices)}"
-                else:
-                    validated_data[field_name] = field_value
 
-            else:  # text, textarea, date
-                validated_data[field_name] = str(field_value)
+def _is_current(schema):
+    """Check a registry entry against ContentType.updated_at after the TTL"""
+    if _is_fresh(schema):
+        return True
+    return _matches_version(schema, _version_query(schema).first())
 
-        except (ValueError, TypeError) as e:
-            errors[field_name] = f"Invalid value for {field.display_name}: {str(e)}"
 
-    if errors:
-        raise ValidationError(errors)
+def _register(content_type_name, schema):
+    with _lock:
+        _registry[content_type_name] = schema
+    return schema
+
+
+def get_content_schema(content_type_name):
+    """Return the compiled schema for an active content type"""
+    schema = _registry.get(content_type_name)
+    if schema is not None and _is_current(schema):
+        return schema
+
+    return _register(content_type_name, _compile(content_type_name))
 
-    return validated_data
+
+async def aget_content_schema(content_type_name):
+    """
+    Async get_content_schema. Registry hits within the TTL never leave the
+    event loop; version checks and compiles go through Django's async ORM.
+    """
+    schema = _registry.get(content_type_name)
+    if schema is not None:
+        if _is_fresh(schema):
+            return schema
+        if _matches_version(schema, await _version_query(schema).afirst()):
+            return schema
+
+    schema = await sync_to_async(_compile)(content_type_name)
+    return _register(content_type_name, schema)
+
+
+def invalidate_content_schema(name=None, pk=None):
+    """Drop registry entries matching a content type name or primary key"""
+    with _lock:
+        for key, schema in list(_registry.items()):
+            if key == name or (pk is not None and schema.pk == pk):
+                del _registry[key]
+
+
+def validate_dynamic_content(content_type_name, data):
+    """
+    Validate submitted data against a content type schema
+    """
+    return get_content_schema(content_type_name).validate(data)
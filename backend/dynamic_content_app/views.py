@@ -1,63 +1,262 @@
 """
 Views for managing dynamic content stored in MongoDB
 """
+import datetime
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from django.conf import settings
 from django.views.decorators.csrf import csrf_exempt
+from django.utils import timezone
 from django.utils.decorators import method_decorator
-from .mongodb import DynamicContent, get_mongodb_connection
-from .validators import validate_dynamic_content
+from django.utils.http import parse_etags
+from .mongodb import (
+    check_mongodb_health,
+    get_content_collection,
+    new_content_document,
+    insert_content_documents,
+    document_to_dict
+)
+from .validators import get_content_schema
+from .query import (
+    build_filter,
+    build_query,
+    parse_fields,
+    field_projection,
+    parse_sort,
+    check_sort
+)
+from .pagination import paginate
+from .search import search
+from .aggregation import aggregate
+from .response_cache import cached_response, cache_metrics, request_stats
+from .renderers import content_renderer_classes
+from .parsers import content_parser_classes
+from .changes import (
+    publish_created,
+    publish_updated,
+    publish_deleted,
+    publish_bulk
+)
+from .stats import (
+    content_created,
+    content_updated,
+    content_deleted,
+    get_counts
+)
+from dynamic_form_project.conditional import conditional, make_etag
 from content_types_app.models import ContentType
 from bson import ObjectId
+from bson.codec_options import CodecOptions
 from bson.errors import InvalidId
+from bson.raw_bson import RawBSONDocument
+from pymongo import ReturnDocument
+from pymongo.errors import OperationFailure
 
 
-# Initialize MongoDB connection
-get_mongodb_connection()
+# Read options for renderers that take stored documents as they are
+RAW_CODEC_OPTIONS = CodecOptions(document_class=RawBSONDocument)
+
+
+def _is_dry_run(request):
+    return request.query_params.get('dry_run', '').lower() in ('true', '1', 'yes')
+
+
+def content_etag(request, schema, stats):
+    return make_etag(
+        schema.name,
+        stats.get('version', 0),
+        schema.version.timestamp(),
+        request.get_full_path(),
+        request.META.get('HTTP_ACCEPT', '')
+    )
+
+
+def content_last_modified(schema, stats):
+    """The later of the last write and the last schema change"""
+    modified_at = stats.get('modified_at')
+    if modified_at is None:
+        return schema.version
+    if timezone.is_naive(modified_at):
+        modified_at = timezone.make_aware(modified_at, datetime.timezone.utc)
+    return max(modified_at, schema.version)
+
+
+def content_validators(request, content_type_name, content_id=None):
+    """
+    ETag / Last-Modified of content reads, derived from the content type's
+    write version and schema version so a 304 never touches the document
+    collection. None for an unknown or inactive content type, which the
+    view answers with a 404.
+    """
+    try:
+        schema = get_content_schema(content_type_name)
+    except ValidationError:
+        return None
+    stats = request_stats(request, content_type_name)
+    return content_etag(request, schema, stats), content_last_modified(schema, stats)
+
+
+def _read_collection(request, schema):
+    """
+    The content type's collection to read from. Renderers flagged
+    raw_documents (BSON) get RawBSONDocument results that are written out
+    undecoded.
+    """
+    collection = get_content_collection(schema.collection_name)
+    if getattr(request.accepted_renderer, 'raw_documents', False):
+        return collection.with_options(codec_options=RAW_CODEC_OPTIONS)
+    return collection
+
+
+def _render_documents(request, documents, fields=None):
+    if getattr(request.accepted_renderer, 'raw_documents', False):
+        return documents
+    return [document_to_dict(document, fields) for document in documents]
+
+
+def _partial_update(validated_data):
+    """
+    $set / $unset for the output of schema.validate(partial=True): fields
+    cleared with an empty value are removed, updated_at and version are bumped
+    """
+    update = {'$set': {'updated_at': datetime.datetime.utcnow()}, '$inc': {'version': 1}}
+    for key, value in validated_data.items():
+        if value is None:
+            update.setdefault('$unset', {})[key] = ''
+        else:
+            update['$set'][key] = value
+    return update
+
+
+class PreconditionFailed(Exception):
+    """Raised for an If-Match header that no entry version can match"""
+
+
+def _entry_query(request, content_type_name, object_id):
+    """
+    Filter of a single entry write. With If-Match: "<version>" it only
+    matches while the entry is at one of the given versions, so the write
+    itself is the concurrency check.
+    """
+    query = {'_id': object_id, 'content_type': content_type_name}
+    header = request.headers.get('If-Match')
+    if header is None or header.strip() == '*':
+        return query
+
+    versions = []
+    for etag in parse_etags(header):
+        # If-Match uses the strong comparison, weak tags never match
+        if etag.startswith('"') and etag[1:-1].isdigit():
+            versions.append(int(etag[1:-1]))
+    if not versions:
+        raise PreconditionFailed
+    if 0 in versions:
+        # Entries written before versioning have no version field
+        versions.append(None)
+    query['version'] = {'$in': versions}
+    return query
+
+
+def _missing_entry_response(collection, query):
+    """
+    404, or 412 when the entry exists at another version than If-Match
+    asked for. Only runs after a write matched nothing.
+    """
+    if 'version' in query:
+        document = collection.find_one(
+            {'_id': query['_id'], 'content_type': query['content_type']}, {'version': 1})
+        if document is not None:
+            return Response(
+                {
+                    'error': 'The entry was modified since it was read',
+                    'version': document.get('version', 0)
+                },
+                status=status.HTTP_412_PRECONDITION_FAILED
+            )
+    return Response(
+        {'error': 'Content not found'},
+        status=status.HTTP_404_NOT_FOUND
+    )
+
+
+def _precondition_failed_response():
+    return Response(
+        {'error': 'If-Match must list entry versions, e.g. "3"'},
+        status=status.HTTP_412_PRECONDITION_FAILED
+    )
+
+
+class ContentAPIView(APIView):
+    """
+    Base view of the content endpoints: JSON plus MessagePack and BSON,
+    negotiated through the Accept and Content-Type headers
+    """
+    renderer_classes = content_renderer_classes()
+    parser_classes = content_parser_classes()
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class DynamicContentListView(APIView):
+class DynamicContentListView(ContentAPIView):
     """
     List all content for a specific content type or create new content
     """
     
+    @conditional(content_validators)
+    @cached_response
     def get(self, request, content_type_name):
-        """Get all content entries for a content type"""
+        """Get a page of content entries for a content type"""
         try:
             # Verify content type exists
-            ContentType.objects.get(name=content_type_name, is_active=True)
-        except ContentType.DoesNotExist:
+            schema = get_content_schema(content_type_name)
+        except ValidationError:
             return Response(
                 {'error': f"Content type '{content_type_name}' not found"},
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Query MongoDB for all documents of this content type
-        documents = DynamicContent.objects(content_type=content_type_name)
+        # Compile ?<field>__<op>=value filters and ?sort= against the schema
+        query = build_query(schema, request.query_params)
+        sort = parse_sort(schema, request.query_params.get('sort'))
+        check_sort(schema, sort, get_content_collection(schema.collection_name))
+        
+        # Only load the requested fields (plus the sort keys) from MongoDB
+        fields = parse_fields(schema, request.query_params.get('fields'))
+        projection = field_projection(fields, sort)
         
-        # Convert to list of dictionaries
-        results = [doc.to_dict() for doc in documents]
+        # Query MongoDB for one page of raw documents of this content type
+        documents, next_cursor = paginate(
+            _read_collection(request, schema), query, request, sort, projection)
+        
+        # Convert to list of dictionaries without hydrating DynamicContent
+        results = _render_documents(request, documents, fields)
         
         return Response({
             'content_type': content_type_name,
             'count': len(results),
+            'next': next_cursor,
             'results': results
         })
     
     def post(self, request, content_type_name):
-        """Create new content entry"""
+        """Create new content entry; ?dry_run=true only validates it"""
         try:
             # Validate data against content type schema
-            validated_data = validate_dynamic_content(content_type_name, request.data)
+            schema = get_content_schema(content_type_name)
+            validated_data = schema.validate(request.data)
+            
+            if _is_dry_run(request):
+                return Response({'dry_run': True, 'valid': True})
             
-            # Create new MongoDB document
-            doc = DynamicContent(content_type=content_type_name, **validated_data)
-            doc.save()
+            # Insert into the content type's collection
+            document = new_content_document(content_type_name, validated_data)
+            get_content_collection(schema.collection_name).insert_one(document)
+            content_created(content_type_name)
             
             # Convert to dict to ensure JSON serialization
-            result_data = doc.to_dict()
+            result_data = document_to_dict(document)
+            publish_created(content_type_name, [document])
             
             return Response(
                 {
@@ -79,83 +278,425 @@ class DynamicContentListView(APIView):
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class DynamicContentDetailView(APIView):
+class DynamicContentBulkView(ContentAPIView):
+    """
+    Create, update or delete many content entries in one request
+    """
+    
+    def post(self, request, content_type_name):
+        """
+        Validate an array of entries and insert the valid ones with
+        unordered insert_many calls of CONTENT_BULK_CHUNK_SIZE documents.
+        Invalid or rejected items are reported by their index. Formats
+        without top level arrays (BSON) send {"items": [...]}.
+        """
+        items = request.data
+        if isinstance(items, dict) and 'items' in items:
+            items = items['items']
+        if not isinstance(items, list):
+            return Response(
+                {'error': 'Expected a list of content entries'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if len(items) > settings.CONTENT_BULK_MAX_ITEMS:
+            return Response(
+                {'error': f"At most {settings.CONTENT_BULK_MAX_ITEMS} entries per request"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            schema = get_content_schema(content_type_name)
+        except ValidationError as e:
+            return Response(
+                {'error': e.detail},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        # Validate every item against the compiled schema in a single pass
+        errors = []
+        indexes = []
+        documents = []
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                errors.append({'index': index, 'errors': 'Expected an object'})
+                continue
+            try:
+                validated_data = schema.validate(item)
+            except ValidationError as e:
+                errors.append({'index': index, 'errors': e.detail})
+                continue
+            indexes.append(index)
+            documents.append(new_content_document(content_type_name, validated_data))
+        
+        # Write in unordered chunks so one bad document doesn't stop the rest
+        failed = insert_content_documents(
+            get_content_collection(schema.collection_name),
+            documents,
+            settings.CONTENT_BULK_CHUNK_SIZE
+        )
+        for position, message in failed.items():
+            errors.append({'index': indexes[position], 'errors': message})
+        content_created(content_type_name, len(documents) - len(failed))
+        
+        created = [
+            {'index': indexes[position], 'id': str(document['_id'])}
+            for position, document in enumerate(documents)
+            if position not in failed
+        ]
+        publish_created(content_type_name, [
+            document for position, document in enumerate(documents)
+            if position not in failed
+        ])
+        errors.sort(key=lambda error: error['index'])
+        
+        if not errors:
+            response_status = status.HTTP_201_CREATED
+        elif created:
+            response_status = status.HTTP_207_MULTI_STATUS
+        else:
+            response_status = status.HTTP_400_BAD_REQUEST
+        
+        return Response(
+            {
+                'content_type': content_type_name,
+                'created_count': len(created),
+                'error_count': len(errors),
+                'created': created,
+                'errors': errors
+            },
+            status=response_status
+        )
+    
+    def patch(self, request, content_type_name):
+        """
+        Apply {"set": {...}} to every entry matching {"filter": {...}} with a
+        single update_many. Pass ?dry_run=true to only count the matches.
+        """
+        try:
+            schema = get_content_schema(content_type_name)
+        except ValidationError as e:
+            return Response(
+                {'error': e.detail},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        data = request.data if isinstance(request.data, dict) else {}
+        try:
+            query = build_filter(schema, data.get('filter'))
+            changes = data.get('set')
+            if not isinstance(changes, dict) or not changes:
+                raise ValidationError({'set': 'Expected a non-empty object'})
+            validated_data = schema.validate(changes, partial=True)
+        except ValidationError as e:
+            return Response(
+                {'error': e.detail},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        collection = get_content_collection(schema.collection_name)
+        
+        if _is_dry_run(request):
+            return Response({
+                'dry_run': True,
+                'matched_count': collection.count_documents(query)
+            })
+        
+        result = collection.update_many(query, _partial_update(validated_data))
+        content_updated(content_type_name, result.modified_count)
+        publish_bulk(content_type_name, 'bulk_update', result.modified_count)
+        
+        return Response({
+            'message': 'Content updated successfully',
+            'matched_count': result.matched_count,
+            'modified_count': result.modified_count
+        })
+    
+    def delete(self, request, content_type_name):
+        """
+        Delete every entry matching {"filter": {...}} with a single
+        delete_many. Pass ?dry_run=true to only count the matches.
+        """
+        try:
+            schema = get_content_schema(content_type_name)
+        except ValidationError as e:
+            return Response(
+                {'error': e.detail},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        data = request.data if isinstance(request.data, dict) else {}
+        try:
+            query = build_filter(schema, data.get('filter'))
+        except ValidationError as e:
+            return Response(
+                {'error': e.detail},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        collection = get_content_collection(schema.collection_name)
+        
+        if _is_dry_run(request):
+            return Response({
+                'dry_run': True,
+                'matched_count': collection.count_documents(query)
+            })
+        
+        result = collection.delete_many(query)
+        content_deleted(content_type_name, result.deleted_count)
+        publish_bulk(content_type_name, 'bulk_delete', result.deleted_count)
+        
+        return Response({
+            'message': 'Content deleted successfully',
+            'deleted_count': result.deleted_count
+        })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class DynamicContentSearchView(ContentAPIView):
+    """
+    Full-text search over the text and textarea fields of a content type
+    """
+    
+    @conditional(content_validators)
+    def get(self, request, content_type_name):
+        """Get a page of entries matching ?q=, most relevant first"""
+        try:
+            schema = get_content_schema(content_type_name)
+        except ValidationError:
+            return Response(
+                {'error': f"Content type '{content_type_name}' not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        try:
+            results, next_cursor = search(
+                get_content_collection(schema.collection_name), schema, request)
+        except OperationFailure as e:
+            # IndexNotFound: the text index is still being built
+            if e.code != 27:
+                raise
+            return Response(
+                {'error': 'The search index is not ready yet'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+        
+        return Response({
+            'content_type': content_type_name,
+            'query': request.query_params.get('q'),
+            'count': len(results),
+            'next': next_cursor,
+            'results': results
+        })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class DynamicContentAggregateView(ContentAPIView):
+    """
+    Counts, sums, averages and min/max per group over a content type
+    """
+    
+    @conditional(content_validators)
+    def get(self, request, content_type_name):
+        """Aggregate the entries matching the filters, grouped by ?group_by="""
+        try:
+            schema = get_content_schema(content_type_name)
+        except ValidationError:
+            return Response(
+                {'error': f"Content type '{content_type_name}' not found"},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        results = aggregate(
+            get_content_collection(schema.collection_name), schema, request.query_params)
+        
+        return Response({
+            'content_type': content_type_name,
+            'count': len(results),
+            'results': results
+        })
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class DynamicContentDetailView(ContentAPIView):
     """
     Retrieve, update, or delete a specific content entry
     """
     
+    @conditional(content_validators)
+    @cached_response
     def get(self, request, content_type_name, content_id):
         """Get a specific content entry"""
         try:
-            doc = DynamicContent.objects.get(
-                id=ObjectId(content_id),
-                content_type=content_type_name
+            schema = get_content_schema(content_type_name)
+        except ValidationError:
+            return Response(
+                {'error': 'Content not found'},
+                status=status.HTTP_404_NOT_FOUND
             )
-            return Response(doc.to_dict())
+        fields = parse_fields(schema, request.query_params.get('fields'))
         
-        except (DynamicContent.DoesNotExist, InvalidId):
+        try:
+            document = _read_collection(request, schema).find_one(
+                {'_id': ObjectId(content_id), 'content_type': content_type_name},
+                field_projection(fields)
+            )
+        except InvalidId:
+            document = None
+        
+        if document is None:
             return Response(
                 {'error': 'Content not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        return Response(_render_documents(request, [document], fields)[0])
     
     def put(self, request, content_type_name, content_id):
         """Update a content entry"""
         try:
-            # Get existing document
-            doc = DynamicContent.objects.get(
-                id=ObjectId(content_id),
-                content_type=content_type_name
-            )
-            
-            # Validate new data
-            validated_data = validate_dynamic_content(content_type_name, request.data)
-            
-            # Update document fields
-            for key, value in validated_data.items():
-                setattr(doc, key, value)
-            
-            doc.save()
-            
-            return Response({
-                'message': 'Content updated successfully',
-                'data': doc.to_dict()
-            })
-        
-        except (DynamicContent.DoesNotExist, InvalidId):
+            schema = get_content_schema(content_type_name)
+            object_id = ObjectId(content_id)
+        except (ValidationError, InvalidId):
             return Response(
                 {'error': 'Content not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        try:
+            query = _entry_query(request, content_type_name, object_id)
+        except PreconditionFailed:
+            return _precondition_failed_response()
+        collection = get_content_collection(schema.collection_name)
+        
+        try:
+            # Validate new data
+            validated_data = schema.validate(request.data)
+            validated_data['updated_at'] = datetime.datetime.utcnow()
+            
+            # Update document fields in place, returning the new version
+            document = collection.find_one_and_update(
+                query,
+                {'$set': validated_data, '$inc': {'version': 1}},
+                return_document=ReturnDocument.AFTER
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
+        
+        if document is None:
+            return _missing_entry_response(collection, query)
+        
+        content_updated(content_type_name)
+        publish_updated(content_type_name, document)
+        
+        return Response({
+            'message': 'Content updated successfully',
+            'data': document_to_dict(document)
+        })
     
-    def delete(self, request, content_type_name, content_id):
-        """Delete a content entry"""
+    def patch(self, request, content_type_name, content_id):
+        """
+        Update only the supplied fields of a content entry in one
+        find_one_and_update. Optional fields sent empty are removed.
+        """
         try:
-            doc = DynamicContent.objects.get(
-                id=ObjectId(content_id),
-                content_type=content_type_name
+            schema = get_content_schema(content_type_name)
+            object_id = ObjectId(content_id)
+        except (ValidationError, InvalidId):
+            return Response(
+                {'error': 'Content not found'},
+                status=status.HTTP_404_NOT_FOUND
             )
-            doc.delete()
-            
+        
+        if not isinstance(request.data, dict) or not request.data:
+            return Response(
+                {'error': 'Expected a non-empty object'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            validated_data = schema.validate(request.data, partial=True)
+        except ValidationError as e:
             return Response(
-                {'message': 'Content deleted successfully'},
-                status=status.HTTP_204_NO_CONTENT
+                {'error': e.detail},
+                status=status.HTTP_400_BAD_REQUEST
             )
         
-        except (DynamicContent.DoesNotExist, InvalidId):
+        try:
+            query = _entry_query(request, content_type_name, object_id)
+        except PreconditionFailed:
+            return _precondition_failed_response()
+        collection = get_content_collection(schema.collection_name)
+        
+        document = collection.find_one_and_update(
+            query,
+            _partial_update(validated_data),
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if document is None:
+            return _missing_entry_response(collection, query)
+        
+        content_updated(content_type_name)
+        publish_updated(content_type_name, document)
+        
+        return Response({
+            'message': 'Content updated successfully',
+            'data': document_to_dict(document)
+        })
+    
+    def delete(self, request, content_type_name, content_id):
+        """Delete a content entry"""
+        try:
+            schema = get_content_schema(content_type_name)
+            object_id = ObjectId(content_id)
+        except (ValidationError, InvalidId):
             return Response(
                 {'error': 'Content not found'},
                 status=status.HTTP_404_NOT_FOUND
             )
+        
+        try:
+            query = _entry_query(request, content_type_name, object_id)
+        except PreconditionFailed:
+            return _precondition_failed_response()
+        collection = get_content_collection(schema.collection_name)
+        
+        result = collection.delete_one(query)
+        if not result.deleted_count:
+            return _missing_entry_response(collection, query)
+        
+        content_deleted(content_type_name)
+        publish_deleted(content_type_name, content_id)
+        
+        return Response(
+            {'message': 'Content deleted successfully'},
+            status=status.HTTP_204_NO_CONTENT
+        )
 
 
 @method_decorator(csrf_exempt, name='dispatch')
-class ContentTypeDataView(APIView):
+class MongoHealthView(ContentAPIView):
+    """
+    MongoDB reachability and connection pool counters of this process
+    """
+    
+    def get(self, request):
+        """Ping MongoDB, answering 503 when it can't be reached"""
+        health = check_mongodb_health()
+        health['cache'] = cache_metrics.stats()
+        return Response(
+            health,
+            status=status.HTTP_200_OK if health['status'] == 'ok'
+            else status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+
+@method_decorator(csrf_exempt, name='dispatch')
+class ContentTypeDataView(ContentAPIView):
     """
     Get all content for all content types (overview)
     """
@@ -164,13 +705,15 @@ class ContentTypeDataView(APIView):
         """Get summary of all content types and their counts"""
         content_types = ContentType.objects.filter(is_active=True)
         
+        # One lookup in the counters collection instead of a count per type
+        counts = get_counts(ct.name for ct in content_types)
+        
         results = []
         for ct in content_types:
-            count = DynamicContent.objects(content_type=ct.name).count()
             results.append({
                 'content_type': ct.name,
                 'display_name': ct.display_name,
-                'count': count
+                'count': counts.get(ct.name, 0)
             })
         
         return Response(results)
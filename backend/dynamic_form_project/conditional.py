@@ -0,0 +1,84 @@
+"""
+Conditional GET support (ETag / Last-Modified / 304) shared by the API apps
+"""
+import calendar
+import functools
+import hashlib
+import inspect
+
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+
+def make_etag(*parts):
+    """Build a strong ETag from the values a representation depends on"""
+    digest = hashlib.md5(
+        '\x1f'.join(str(part) for part in parts).encode(),
+        usedforsecurity=False
+    ).hexdigest()
+    return quote_etag(digest)
+
+
+def _timestamp(last_modified):
+    return calendar.timegm(last_modified.utctimetuple()) if last_modified else None
+
+
+def _add_validators(response, etag, timestamp):
+    response.headers.setdefault('ETag', etag)
+    if timestamp is not None:
+        response.headers.setdefault('Last-Modified', http_date(timestamp))
+    patch_vary_headers(response, ['Accept'])
+    return response
+
+
+def conditional(validators):
+    """
+    Add ETag / Last-Modified handling to a GET view method
+
+    validators(request, *args, **kwargs) returns (etag, last_modified) where
+    last_modified is a datetime or None, or None when the resource doesn't
+    exist. It should only consult cheap version data: when the client's copy
+    is current the view itself is never called and 304 is returned.
+
+    Async view methods take async validators.
+    """
+    def decorator(method):
+        if inspect.iscoroutinefunction(method):
+            @functools.wraps(method)
+            async def async_wrapper(self, request, *args, **kwargs):
+                state = await validators(request, *args, **kwargs)
+                if state is None:
+                    return await method(self, request, *args, **kwargs)
+
+                etag, last_modified = state
+                timestamp = _timestamp(last_modified)
+
+                response = get_conditional_response(
+                    request, etag=etag, last_modified=timestamp)
+                if response is None:
+                    response = await method(self, request, *args, **kwargs)
+                    if response.status_code != 200:
+                        return response
+
+                return _add_validators(response, etag, timestamp)
+            return async_wrapper
+
+        @functools.wraps(method)
+        def wrapper(self, request, *args, **kwargs):
+            state = validators(request, *args, **kwargs)
+            if state is None:
+                return method(self, request, *args, **kwargs)
+
+            etag, last_modified = state
+            timestamp = _timestamp(last_modified)
+
+            response = get_conditional_response(
+                request, etag=etag, last_modified=timestamp)
+            if response is None:
+                response = method(self, request, *args, **kwargs)
+                if response.status_code != 200:
+                    return response
+
+            return _add_validators(response, etag, timestamp)
+        return wrapper
+    return decorator
@@ -3,7 +3,7 @@ Django settings for dynamic_form_project.
 """
 
 from pathlib import Path
-from decouple import config
+from decouple import config, Csv
 import os
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -96,6 +96,106 @@ else:
     }
 
 
+def _optional_int(value):
+    return int(value) if value not in (None, '') else None
+
+
+# pymongo client options shared by every MongoDB client of a process (the
+# MongoEngine one and the Motor one of the async views). Unset values keep
+# pymongo's defaults; compressors is a list such as zstd,zlib
+MONGODB_CLIENT_OPTIONS = {
+    'maxPoolSize': config('MONGODB_MAX_POOL_SIZE', default=100, cast=int),
+    'minPoolSize': config('MONGODB_MIN_POOL_SIZE', default=0, cast=int),
+    'maxIdleTimeMS': config('MONGODB_MAX_IDLE_TIME_MS', default=None, cast=_optional_int),
+    'waitQueueTimeoutMS': config('MONGODB_WAIT_QUEUE_TIMEOUT_MS', default=None, cast=_optional_int),
+    'connectTimeoutMS': config('MONGODB_CONNECT_TIMEOUT_MS', default=None, cast=_optional_int),
+    'socketTimeoutMS': config('MONGODB_SOCKET_TIMEOUT_MS', default=None, cast=_optional_int),
+    'serverSelectionTimeoutMS': config('MONGODB_SERVER_SELECTION_TIMEOUT_MS', default=None, cast=_optional_int),
+    'compressors': config('MONGODB_COMPRESSORS', default='', cast=Csv()),
+}
+
+
+# Dynamic content list pagination
+# Default number of entries per page and the upper bound for ?page_size=
+CONTENT_PAGE_SIZE = config('CONTENT_PAGE_SIZE', default=50, cast=int)
+CONTENT_MAX_PAGE_SIZE = config('CONTENT_MAX_PAGE_SIZE', default=500, cast=int)
+
+# Sorting on fields without an index is refused for content types holding
+# more entries than this, as it would need an in-memory sort
+CONTENT_UNINDEXED_SORT_LIMIT = config('CONTENT_UNINDEXED_SORT_LIMIT', default=10000, cast=int)
+
+# Bulk create: maximum entries per request and documents per insert_many call
+CONTENT_BULK_MAX_ITEMS = config('CONTENT_BULK_MAX_ITEMS', default=10000, cast=int)
+CONTENT_BULK_CHUNK_SIZE = config('CONTENT_BULK_CHUNK_SIZE', default=1000, cast=int)
+
+# Documents fetched per Mongo round-trip while streaming an export
+CONTENT_EXPORT_BATCH_SIZE = config('CONTENT_EXPORT_BATCH_SIZE', default=1000, cast=int)
+
+# Run maintenance jobs such as field index builds on a background thread;
+# set to False to run them inline when the triggering change commits
+CONTENT_BACKGROUND_TASKS = config('CONTENT_BACKGROUND_TASKS', default=True, cast=bool)
+
+# Seconds a compiled content type schema is trusted before it is checked
+# against ContentType.updated_at (local admin changes invalidate immediately)
+CONTENT_SCHEMA_TTL = config('CONTENT_SCHEMA_TTL', default=30, cast=int)
+
+# Rewrites of stored entries after a field is renamed, retyped or removed:
+# entries per bulk_write and seconds to pause between batches
+CONTENT_SCHEMA_MIGRATION_BATCH_SIZE = config('CONTENT_SCHEMA_MIGRATION_BATCH_SIZE', default=500, cast=int)
+CONTENT_SCHEMA_MIGRATION_PAUSE = config('CONTENT_SCHEMA_MIGRATION_PAUSE', default=0.05, cast=float)
+
+# Stemming and stop words of the full-text search indexes ("none" disables both)
+CONTENT_SEARCH_LANGUAGE = config('CONTENT_SEARCH_LANGUAGE', default='english')
+
+# Aggregations: the most groups a request may produce, and how long results
+# stay in the cache (they are keyed by the write version, so never stale)
+CONTENT_AGGREGATE_MAX_GROUPS = config('CONTENT_AGGREGATE_MAX_GROUPS', default=1000, cast=int)
+CONTENT_AGGREGATE_CACHE_TTL = config('CONTENT_AGGREGATE_CACHE_TTL', default=3600, cast=int)
+
+# Cache of rendered list / detail reads and aggregation results. Entries are
+# keyed by the content type's write version, so writes invalidate them
+# without deleting keys. The default backend is a bounded in-process LRU;
+# point CONTENT_CACHE_BACKEND / CONTENT_CACHE_LOCATION at e.g. Redis to share
+# it between processes. The LRU is bounded by entry count, so its worst case
+# per process is CONTENT_CACHE_MAX_ENTRIES x CONTENT_RESPONSE_CACHE_MAX_BYTES
+# (32 MiB with the defaults); larger responses are not cached
+CONTENT_RESPONSE_CACHE = config('CONTENT_RESPONSE_CACHE', default=True, cast=bool)
+CONTENT_RESPONSE_CACHE_MAX_BYTES = config('CONTENT_RESPONSE_CACHE_MAX_BYTES', default=65536, cast=int)
+CONTENT_CACHE_BACKEND = config(
+    'CONTENT_CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'content': {
+        'BACKEND': CONTENT_CACHE_BACKEND,
+        'LOCATION': config('CONTENT_CACHE_LOCATION', default='content'),
+        'TIMEOUT': config('CONTENT_CACHE_TIMEOUT', default=300, cast=int),
+    },
+}
+if CONTENT_CACHE_BACKEND.endswith('LocMemCache'):
+    CACHES['content']['OPTIONS'] = {
+        'MAX_ENTRIES': config('CONTENT_CACHE_MAX_ENTRIES', default=500, cast=int),
+    }
+
+# Change feed (/api/content/<type>/changes/): "auto" reads MongoDB change
+# streams when the server is a replica set or sharded cluster and the
+# in-process publish hook otherwise; "change_streams" or "hook" force one.
+# The hook keeps the last CONTENT_CHANGES_BUFFER events per content type
+# for reconnecting clients
+CONTENT_CHANGES_SOURCE = config('CONTENT_CHANGES_SOURCE', default='auto')
+CONTENT_CHANGES_BUFFER = config('CONTENT_CHANGES_BUFFER', default=500, cast=int)
+# Seconds between keepalive comments on an idle feed, and the reconnect
+# delay suggested to EventSource in milliseconds
+CONTENT_CHANGES_HEARTBEAT = config('CONTENT_CHANGES_HEARTBEAT', default=15, cast=int)
+CONTENT_CHANGES_RETRY_MS = config('CONTENT_CHANGES_RETRY_MS', default=3000, cast=int)
+
+# Serve content reads (list, detail, overview) from native async views using
+# Motor. Only worth enabling when running under ASGI (asgi.py)
+CONTENT_ASYNC_VIEWS = config('CONTENT_ASYNC_VIEWS', default=False, cast=bool)
+
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -281,16 +281,18 @@ document.getElementById('view-content-type-select').addEventListener('change', a
     await loadContent(contentTypeName);
 });
 
-// Load and display content
+// Load and display the first page of content
+let contentItems = [];
+let contentNextCursor = null;
+
 async function loadContent(contentTypeName) {
     const container = document.getElementById('content-list-container');
     container.innerHTML = '<div class="loading">Loading content...</div>';
+    contentItems = [];
+    contentNextCursor = null;
     
     try {
-        const response = await fetch(`${API_BASE}/api/content/${contentTypeName}/`);
-        const data = await response.json();
-        
-        displayContent(data.results, contentTypeName);
+        await fetchContentPage(contentTypeName);
     } catch (error) {
         console.error('Error loading content:', error);
         container.innerHTML = `
@@ -301,6 +303,29 @@ async function loadContent(contentTypeName) {
     }
 }
 
+// Append the next page of a paginated list
+async function loadMoreContent(contentTypeName) {
+    try {
+        await fetchContentPage(contentTypeName, contentNextCursor);
+    } catch (error) {
+        console.error('Error loading content:', error);
+        showAlert('Failed to load more content', 'error');
+    }
+}
+
+async function fetchContentPage(contentTypeName, cursor = null) {
+    const params = new URLSearchParams();
+    if (cursor) {
+        params.set('cursor', cursor);
+    }
+    const response = await fetch(`${API_BASE}/api/content/${contentTypeName}/?${params}`);
+    const data = await response.json();
+    contentItems.push(...data.results);
+    contentNextCursor = data.next;
+    
+    displayContent(contentItems, contentTypeName);
+}
+
 // Display content items
 function displayContent(items, contentTypeName) {
     const container = document.getElementById('content-list-container');
@@ -338,6 +363,14 @@ function displayContent(items, contentTypeName) {
             </div>
         </div>
     `).join('');
+    
+    if (contentNextCursor) {
+        container.innerHTML += `
+            <button class="btn" onclick="loadMoreContent('${contentTypeName}')">
+                Load more
+            </button>
+        `;
+    }
 }
 
 // Delete content
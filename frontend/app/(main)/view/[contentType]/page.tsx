@@ -4,7 +4,7 @@ import { contentTypesApi, contentApi } from '@/lib/api';
 import { Card, CardContent, CardDescription, CardHeader, CardTitle } from '@/components/ui/card';
 import { Button } from '@/components/ui/button';
 import { ArrowLeft, Plus, Database } from 'lucide-react';
-import { DynamicContentTable } from '@/components/dynamic-content-table';
+import { PaginatedContentTable } from '@/components/paginated-content-table';
 
 export const dynamic = 'force-dynamic';
 export const revalidate = 0;
@@ -48,7 +48,8 @@ export default async function ViewPage({ params }: ViewPageProps) {
                 {contentType.display_name}
               </h1>
               <p className="text-muted-foreground">
-                {contentData.count} {contentData.count === 1 ? 'entry' : 'entries'}
+                {contentData.results.length}{contentData.next ? '+' : ''}{' '}
+                {contentData.results.length === 1 && !contentData.next ? 'entry' : 'entries'}
               </p>
             </div>
             <Button asChild>
@@ -83,9 +84,10 @@ export default async function ViewPage({ params }: ViewPageProps) {
         ) : (
           <Card>
             <CardContent>
-              <DynamicContentTable
+              <PaginatedContentTable
                 contentType={contentType}
-                data={contentData.results}
+                initialResults={contentData.results}
+                initialNext={contentData.next}
               />
             </CardContent>
           </Card>
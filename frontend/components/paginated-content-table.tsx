@@ -0,0 +1,59 @@
+"use client"
+
+import { useEffect, useState } from 'react';
+import type { Content, ContentTypeResponse } from '@/lib/types';
+import { contentApi, handleApiError } from '@/lib/api';
+import { Button } from '@/components/ui/button';
+import { DynamicContentTable } from '@/components/dynamic-content-table';
+import { Loader2 } from 'lucide-react';
+import { toast } from 'sonner';
+
+interface PaginatedContentTableProps {
+  contentType: ContentTypeResponse;
+  initialResults: Content[];
+  initialNext: string | null;
+}
+
+export function PaginatedContentTable({
+  contentType,
+  initialResults,
+  initialNext,
+}: PaginatedContentTableProps) {
+  const [results, setResults] = useState(initialResults);
+  const [next, setNext] = useState(initialNext);
+  const [loading, setLoading] = useState(false);
+
+  // Start over from the first page when the server re-renders (e.g. after a delete)
+  useEffect(() => {
+    setResults(initialResults);
+    setNext(initialNext);
+  }, [initialResults, initialNext]);
+
+  const loadMore = async () => {
+    if (!next) return;
+    setLoading(true);
+    try {
+      const page = await contentApi.getAll(contentType.name, next);
+      setResults((current) => [...current, ...page.results]);
+      setNext(page.next);
+    } catch (error) {
+      toast.error(handleApiError(error).error || 'Failed to load more entries');
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  return (
+    <>
+      <DynamicContentTable contentType={contentType} data={results} />
+      {next && (
+        <div className="flex justify-center pt-4">
+          <Button variant="outline" onClick={loadMore} disabled={loading}>
+            {loading && <Loader2 className="h-4 w-4 mr-2 animate-spin" />}
+            Load more
+          </Button>
+        </div>
+      )}
+    </>
+  );
+}
@@ -40,9 +40,11 @@ export const contentTypesApi = {
 
 // Dynamic Content API
 export const contentApi = {
-  // Get all content for a specific type
-  getAll: async (contentTypeName: string): Promise<ContentListResponse> => {
-    const response = await api.get<ContentListResponse>(`/api/content/${contentTypeName}/`);
+  // Get one page of content for a specific type; pass the previous page's `next` as cursor
+  getAll: async (contentTypeName: string, cursor?: string | null): Promise<ContentListResponse> => {
+    const response = await api.get<ContentListResponse>(`/api/content/${contentTypeName}/`, {
+      params: cursor ? { cursor } : {},
+    });
     return response.data;
   },
 
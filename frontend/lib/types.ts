@@ -38,7 +38,9 @@ export interface Content extends Record<string, unknown> {
 }
 
 export interface ContentListResponse {
+  // Entries in this page, not the total
   count: number;
+  next: string | null;
   results: Content[];
 }
 